@@ -0,0 +1,19 @@
+"""
+ASGI config for app project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Views run on a thread pool of ASGI_THREADS threads, see core.asgi.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+wsgi_application = get_wsgi_application()
+
+from core.asgi import ASGIHandler  # noqa: E402
+
+application = ASGIHandler(wsgi_application, settings.ASGI_THREADS)
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -45,6 +46,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,16 +82,57 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# DB_CONN_MAX_AGE keeps connections open across requests for that many
+# seconds. When requests start, reused connections are pinged at most once
+# every DB_HEALTH_CHECK_INTERVAL seconds and reopened if they died; 0 leaves
+# that to Django, which drops connections after errors.
+# Set DB_POOL_MODE=transaction when DB_HOST/DB_PORT point at a transaction
+# mode pooler such as PgBouncer, which cannot keep server side cursors open
+# between transactions.
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.environ.get('DB_POOL_MODE') == 'transaction'
+        ),
     }
 }
 
+DB_HEALTH_CHECK_INTERVAL = int(os.environ.get('DB_HEALTH_CHECK_INTERVAL', 30))
+
+# DB_REPLICA_HOSTS is a comma separated list of read replicas of the
+# primary, reached with its port and credentials. Safe requests read from
+# them, see core.routers. Tests use the test database of the primary.
+
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = 'replica_%d' % index
+    DATABASES[alias] = dict(
+        DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'}
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Writers read from the primary for PIN_SECONDS, remembered in the
+# PIN_CACHE entry of CACHES, which must be shared by all workers: the app
+# refuses to start with replicas and a local memory pin cache.
+# Models in PRIMARY_MODELS are always read from the primary.
+
+REPLICA_ROUTING = {
+    'PIN_SECONDS': int(os.environ.get('REPLICA_PIN_SECONDS', 10)),
+    'PIN_CACHE': os.environ.get('REPLICA_PIN_CACHE', 'default'),
+    'PRIMARY_MODELS': ['authtoken.token'],
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -108,6 +153,25 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# The first hasher stores new passwords. Hashes made by the other hashers, or
+# with other cost parameters, are rehashed on the next successful login.
+
+PASSWORD_HASHERS = [
+    'core.hashers.TunedPBKDF2PasswordHasher',
+    'core.hashers.TunedArgon2PasswordHasher',
+]
+if os.environ.get('PASSWORD_HASHER') == 'argon2':
+    PASSWORD_HASHERS.reverse()
+
+PASSWORD_HASHER_COST = {
+    'PBKDF2_ITERATIONS': int(os.environ.get('PBKDF2_ITERATIONS', 120000)),
+    'ARGON2_TIME_COST': int(os.environ.get('ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(os.environ.get('ARGON2_MEMORY_COST', 512)),
+    'ARGON2_PARALLELISM': int(os.environ.get('ARGON2_PARALLELISM', 2)),
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
 
@@ -128,3 +192,106 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 AUTH_USER_MODEL = 'core.User'
+
+
+# Caches
+# SHARED_CACHE_BACKEND and SHARED_CACHE_LOCATION add a "shared" entry, such
+# as a memcached server, for the settings below naming a cache shared by
+# all workers
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+if os.environ.get('SHARED_CACHE_BACKEND'):
+    CACHES['shared'] = {
+        'BACKEND': os.environ['SHARED_CACHE_BACKEND'],
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION', ''),
+    }
+
+
+# Token authentication cache
+# SHARED_CACHE names an entry of CACHES shared by all workers, if any.
+# Without it, a revoked token or deactivated user is still accepted by other
+# workers for up to LOCAL_TIMEOUT seconds.
+
+TOKEN_AUTH_CACHE = {
+    'LOCAL_MAX_ENTRIES': int(os.environ.get('TOKEN_CACHE_MAX_ENTRIES', 10000)),
+    'LOCAL_TIMEOUT': int(os.environ.get('TOKEN_CACHE_LOCAL_TIMEOUT', 30)),
+    'SHARED_CACHE': os.environ.get('TOKEN_CACHE_SHARED_CACHE'),
+    'SHARED_TIMEOUT': int(os.environ.get('TOKEN_CACHE_SHARED_TIMEOUT', 300)),
+}
+
+
+# Rendered list response cache
+# BACKEND is "local" for an LRU inside each process, or the name of an entry
+# of CACHES shared by all workers
+
+LIST_RESPONSE_CACHE = {
+    'BACKEND': os.environ.get('LIST_CACHE_BACKEND', 'local'),
+    'MAX_ENTRIES': int(os.environ.get('LIST_CACHE_MAX_ENTRIES', 5000)),
+    'TIMEOUT': int(os.environ.get('LIST_CACHE_TIMEOUT', 300)),
+}
+
+
+# ASGI deployment
+# Threads running views behind app.asgi, and so database connections held
+# by each ASGI process
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 8))
+
+
+# Request metrics
+# Share of the requests timed by core.middleware.RequestMetricsMiddleware,
+# from 0 (off) to 1 (every request)
+
+REQUEST_METRICS = {
+    'SAMPLE_RATE': float(os.environ.get('METRICS_SAMPLE_RATE', 0)),
+}
+
+
+# Query budgets
+# When enabled, requests over the query_budget of their view, MAX_QUERIES
+# otherwise, or repeating a query shape more than MAX_REPEATS times are
+# logged by core.middleware.QueryBudgetMiddleware
+
+QUERY_BUDGET = {
+    'ENABLED': os.environ.get('QUERY_BUDGET_ENABLED') == '1',
+    'MAX_QUERIES': int(os.environ.get('QUERY_BUDGET_MAX_QUERIES', 50)),
+    'MAX_REPEATS': int(os.environ.get('QUERY_BUDGET_MAX_REPEATS', 3)),
+}
+
+
+# REST framework
+# NUM_PROXIES is the number of proxies in front of the app, whose addresses
+# end X-Forwarded-For. With 0 the header is ignored, as clients can set it.
+
+REST_FRAMEWORK = {
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+}
+
+
+# Throttling of logins and signups
+# STORE is "local" for counters inside each process, or the name of an
+# entry of CACHES shared by all workers. Rates are requests per s, m, h or d.
+
+THROTTLE = {
+    'STORE': os.environ.get('THROTTLE_STORE', 'local'),
+    'MAX_ENTRIES': int(os.environ.get('THROTTLE_MAX_ENTRIES', 100000)),
+    'RATES': {
+        'login_ip': os.environ.get('THROTTLE_LOGIN_IP', '30/m'),
+        'login_account': os.environ.get('THROTTLE_LOGIN_ACCOUNT', '10/m'),
+        'signup_ip': os.environ.get('THROTTLE_SIGNUP_IP', '20/h'),
+    },
+}
+
+
+# Background jobs
+# Failed jobs with attempts left are retried after RETRY_DELAY seconds,
+# doubled after each attempt up to MAX_RETRY_DELAY, see core.jobs
+
+JOB_QUEUE = {
+    'RETRY_DELAY': int(os.environ.get('JOB_RETRY_DELAY', 10)),
+    'MAX_RETRY_DELAY': int(os.environ.get('JOB_MAX_RETRY_DELAY', 3600)),
+}
@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core.db import check_persistent_connections
+        request_started.connect(check_persistent_connections)
+
+        import core.signals  # noqa: F401
+
+        # Register the background tasks of every app, see core.jobs
+        autodiscover_modules('tasks')
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread safe in-process cache evicting the least recently used entry
+    once it holds max_entries, with an expiry time per entry
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value stored for key unless it has expired"""
+        with self._lock:
+            try:
+                value, expires_at = self._entries[key]
+            except KeyError:
+                return default
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        """Store value for key, for timeout seconds if given"""
+        expires_at = None
+        if timeout is not None:
+            expires_at = time.monotonic() + timeout
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LocalCounterStore:
+    """
+    In-process counters of fixed time windows, for a single process and
+    for tests. hit() counts a request in the current window of a key and
+    returns the counts of the previous and current windows.
+    """
+
+    def __init__(self, max_entries):
+        # Maps a key to [window index, current count, previous count]
+        self._counters = LRUCache(max_entries)
+        self._lock = threading.Lock()
+
+    def hit(self, key, window):
+        index = int(time.time() // window)
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None or counter[0] < index - 1:
+                counter = [index, 0, 0]
+            elif counter[0] == index - 1:
+                counter = [index, 0, counter[1]]
+            counter[1] += 1
+            self._counters.set(key, counter, window * 2)
+            return counter[2], counter[1]
+
+    def clear(self):
+        self._counters.clear()
+
+
+class CacheCounterStore:
+    """
+    Counters of fixed time windows kept in a Django cache shared by all
+    workers. A hit is one atomic incr of the current window; the count of a
+    finished window never changes, so it is fetched once and then kept in
+    process.
+    """
+    key_prefix = 'counter:'
+
+    def __init__(self, cache, max_entries):
+        self.cache = cache
+        self.finished = LRUCache(max_entries)
+
+    def hit(self, key, window):
+        index = int(time.time() // window)
+        current_key = '%s%s:%d' % (self.key_prefix, key, index)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # First hit of the window, unless another worker just added it
+            if self.cache.add(current_key, 1, window * 2):
+                current = 1
+            else:
+                current = self.cache.incr(current_key)
+
+        previous_key = '%s%s:%d' % (self.key_prefix, key, index - 1)
+        previous = self.finished.get(previous_key)
+        if previous is None:
+            previous = self.cache.get(previous_key, 0)
+            self.finished.set(previous_key, previous, window)
+        return previous, current
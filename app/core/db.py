@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+def check_persistent_connections(**kwargs):
+    """
+    Close persistent connections that stopped working while they sat idle,
+    for example after a database restart, so the request opens a new one
+    instead of failing on its first query. Each connection is pinged at
+    most once every DB_HEALTH_CHECK_INTERVAL seconds, to keep the round trip
+    off most requests.
+    """
+    interval = settings.DB_HEALTH_CHECK_INTERVAL
+    if not interval:
+        return
+    now = time.monotonic()
+    for conn in connections.all():
+        if conn.connection is None or not conn.settings_dict['CONN_MAX_AGE']:
+            continue
+        checked_at = getattr(conn, 'health_checked_at', None)
+        if checked_at is not None and now - checked_at < interval:
+            continue
+        conn.health_checked_at = now
+        if not conn.is_usable():
+            conn.close()
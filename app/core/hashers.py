@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, \
+                                        PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher whose iteration count comes from the settings.
+    Hashes made with another count are upgraded on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASHER_COST['PBKDF2_ITERATIONS']
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Memory-hard argon2 hasher whose cost parameters come from the settings.
+    Needs the argon2-cffi package.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_HASHER_COST['ARGON2_TIME_COST']
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_HASHER_COST['ARGON2_MEMORY_COST']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_HASHER_COST['ARGON2_PARALLELISM']
@@ -0,0 +1,220 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Registered tasks by name, filled by the tasks modules of the apps
+TASKS = {}
+
+
+class PermanentError(Exception):
+    """
+    Raised by tasks failing in a way no retry would fix, which fails the
+    job whatever attempts it has left
+    """
+
+
+class Task:
+    """
+    Function run by a worker for each of its jobs. It gets the job and
+    returns a JSON serializable result stored on the job.
+    """
+
+    def __init__(self, func, name, max_attempts=3, priority=0,
+                 concurrency=None, timeout=600, public=False):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.priority = priority
+        # Most jobs of the task running at once, across all workers
+        self.concurrency = concurrency
+        # Seconds after which a running job is taken to be lost and retried
+        self.timeout = timeout
+        # Whether any user may enqueue it through the API, not only staff
+        self.public = public
+
+
+def task(name=None, **options):
+    """Register the decorated function as a task, see Task"""
+    def decorator(func):
+        task_name = name or func.__name__
+        TASKS[task_name] = Task(func, task_name, **options)
+        return func
+    return decorator
+
+
+def enqueue(task_name, payload=None, user=None, priority=None, delay=0):
+    """Queue a job of a registered task and return it"""
+    task = TASKS[task_name]
+    return Job.objects.create(
+        task=task_name,
+        payload=payload or {},
+        user=user,
+        priority=task.priority if priority is None else priority,
+        max_attempts=task.max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay)
+    )
+
+
+def claim():
+    """
+    Take the next due job, by priority then age, and mark it running. Jobs
+    locked by other workers are skipped rather than waited for, and so are
+    tasks at their concurrency limit. Return None when no job is due.
+    """
+    full = set()
+    while True:
+        with transaction.atomic():
+            job = Job.objects.select_for_update(skip_locked=True).filter(
+                status=Job.QUEUED, run_after__lte=timezone.now()
+            ).exclude(task__in=full).order_by(
+                '-priority', 'run_after', 'id'
+            ).first()
+            if job is None:
+                return None
+
+            task = TASKS.get(job.task)
+            if task is not None and task.concurrency:
+                if not has_capacity(task):
+                    full.add(job.task)
+                    continue
+
+            now = timezone.now()
+            timeout = task.timeout if task is not None else 0
+            job.status = Job.RUNNING
+            job.attempts += 1
+            job.started_at = now
+            job.lease_expires_at = now + timedelta(seconds=timeout)
+            job.save(update_fields=[
+                'status', 'attempts', 'started_at', 'lease_expires_at'
+            ])
+            return job
+
+
+def has_capacity(task):
+    """
+    Return whether another job of the task may start. Claims of the task
+    are serialized until the claiming transaction commits, so concurrent
+    workers cannot both take the last slot.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_advisory_xact_lock(hashtext(%s))', ['job:' + task.name]
+        )
+    running = Job.objects.filter(task=task.name, status=Job.RUNNING).count()
+    return running < task.concurrency
+
+
+def run(job):
+    """Run a claimed job and record its outcome"""
+    task = TASKS.get(job.task)
+    try:
+        if task is None:
+            raise LookupError('Unknown task %s' % job.task)
+        result = task.func(job)
+    except Exception as exc:
+        logger.exception('Job %s failed on attempt %d', job, job.attempts)
+        retry = task is not None and not isinstance(exc, PermanentError)
+        if retry and job.attempts < job.max_attempts:
+            finish(job, Job.QUEUED, error=exc,
+                   run_after=timezone.now() + retry_delay(job.attempts))
+        else:
+            finish(job, Job.FAILED, error=exc)
+    else:
+        finish(job, Job.SUCCEEDED, result=result)
+
+
+def finish(job, status, result=None, error=None, run_after=None):
+    """
+    Record the outcome of an attempt, unless the job was reclaimed after
+    its lease expired, in which case the newer attempt owns it
+    """
+    fields = {
+        'status': status,
+        'result': result,
+        'error': '%s: %s' % (type(error).__name__, error) if error else '',
+        'lease_expires_at': None,
+    }
+    if status == Job.QUEUED:
+        fields['run_after'] = run_after
+    else:
+        fields['finished_at'] = timezone.now()
+    updated = Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, attempts=job.attempts
+    ).update(**fields)
+    if updated:
+        for name, value in fields.items():
+            setattr(job, name, value)
+
+
+def set_progress(job, progress):
+    """
+    Record the progress of a running job. This renews its lease too, so a
+    long job reporting progress is not taken to have lost its worker.
+    """
+    job.progress = progress
+    job.lease_expires_at = timezone.now() + timedelta(
+        seconds=TASKS[job.task].timeout
+    )
+    Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, attempts=job.attempts
+    ).update(progress=progress, lease_expires_at=job.lease_expires_at)
+
+
+def retry_delay(attempts):
+    """Return the delay before the next attempt, doubling with each one"""
+    config = settings.JOB_QUEUE
+    return timedelta(seconds=min(
+        config['RETRY_DELAY'] * 2 ** (attempts - 1), config['MAX_RETRY_DELAY']
+    ))
+
+
+def requeue_expired():
+    """
+    Retry the running jobs whose lease expired, or fail them when they
+    have no attempts left. Return how many jobs were changed.
+    """
+    expired = Job.objects.filter(
+        status=Job.RUNNING, lease_expires_at__lt=timezone.now()
+    )
+    changes = {'lease_expires_at': None, 'error': 'Timed out'}
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=timezone.now(), **changes
+    )
+    retried = expired.update(
+        status=Job.QUEUED, run_after=timezone.now(), **changes
+    )
+    return failed + retried
+
+
+def work(stop, poll_interval=1.0, burst=False):
+    """
+    Claim and run jobs until the stop event is set, or in burst mode until
+    no job is due. Meant to run in a thread of its own, with its own
+    database connection.
+    """
+    try:
+        requeue_expired()
+        while not stop.is_set():
+            try:
+                job = claim()
+                if job is not None:
+                    run(job)
+                    continue
+                if burst:
+                    break
+                requeue_expired()
+            except DatabaseError:
+                # Such as a lost connection, opened again on the next query
+                logger.exception('Job worker database error')
+                connection.close()
+            stop.wait(poll_interval)
+    finally:
+        connection.close()
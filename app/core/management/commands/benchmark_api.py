@@ -0,0 +1,155 @@
+import itertools
+import json
+import math
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.query_budget import QueryBudget
+
+
+class Command(BaseCommand):
+    """
+    Django command to benchmark the user, tag and ingredient endpoints
+    in-process at growing data sizes. Every size is seeded with seed_data
+    and rolled back afterwards, so run it against a development database.
+    Results are written as JSON to compare them across commits.
+    """
+    email_prefix = 'benchmark'
+    password = 'benchmark-password'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='100,1000,10000',
+            help='Comma separated tags, ingredients and recipes per user'
+        )
+        parser.add_argument('--users', type=int, default=5)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Timed requests per endpoint and size'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='benchmark-results.json')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        results = []
+        # Time the views, not the rendered response cache or throttling
+        unthrottled = dict(settings.THROTTLE, STORE='local', RATES={
+            scope: '1000000000/s' for scope in settings.THROTTLE['RATES']
+        })
+        with override_settings(ALLOWED_HOSTS=['testserver'],
+                               THROTTLE=unthrottled,
+                               LIST_RESPONSE_CACHE={
+                                   'BACKEND': 'local',
+                                   'MAX_ENTRIES': 0,
+                                   'TIMEOUT': 0,
+                               }):
+            for size in sizes:
+                with transaction.atomic():
+                    results.extend(self.run_size(size, options))
+                    transaction.set_rollback(True)
+
+        with open(options['output'], 'w') as output:
+            json.dump({
+                'commit': self.get_commit(),
+                'created': timezone.now().isoformat(),
+                'requests': options['requests'],
+                'results': results,
+            }, output, indent=2)
+        self.stdout.write('Results written to %s' % options['output'])
+
+    def run_size(self, size, options):
+        call_command(
+            'seed_data', users=options['users'], tags=size,
+            ingredients=size, recipes=size, seed=options['seed'],
+            email_prefix=self.email_prefix, password=self.password,
+            stdout=self.stdout
+        )
+        client = Client()
+        credentials = {
+            'email_add': '%s-0@example.com' % self.email_prefix,
+            'password': self.password,
+        }
+        token = client.post(reverse('user:token'), credentials).json()['token']
+        auth = {'HTTP_AUTHORIZATION': 'Token %s' % token}
+        signups = itertools.count()
+
+        endpoints = (
+            ('signup', lambda: client.post(reverse('user:create'), {
+                'email_add': 'signup-%d@example.com' % next(signups),
+                'password': self.password,
+                'name': 'Signup',
+            })),
+            ('token', lambda: client.post(reverse('user:token'), credentials)),
+            ('me', lambda: client.get(reverse('user:manage'), **auth)),
+            ('tags', lambda: client.get(reverse('recipe:tag-list'), **auth)),
+            ('ingredients', lambda: client.get(
+                reverse('recipe:ingredient-list'), **auth
+            )),
+        )
+
+        results = []
+        self.stdout.write('\nsize %d' % size)
+        for name, request in endpoints:
+            result = self.measure(request, options['requests'])
+            result.update(size=size, endpoint=name)
+            results.append(result)
+            self.stdout.write(
+                '%-12s p50 %8.2f ms  p99 %8.2f ms  %5.1f queries  '
+                '%8.1f KiB peak' % (
+                    name, result['p50_ms'], result['p99_ms'],
+                    result['queries'], result['peak_memory_kib']
+                )
+            )
+        return results
+
+    def measure(self, request, count):
+        """Time count requests, then trace the memory of one more"""
+        latencies = []
+        queries = 0
+        for _ in range(count):
+            with QueryBudget(max_repeats=None) as budget:
+                start = time.perf_counter()
+                response = request()
+                latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise CommandError('Request failed with %d: %s' % (
+                    response.status_code, response.content
+                ))
+            queries += budget.queries
+
+        tracemalloc.start()
+        request()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        latencies.sort()
+        return {
+            'p50_ms': round(self.percentile(latencies, 50), 3),
+            'p99_ms': round(self.percentile(latencies, 99), 3),
+            'queries': round(queries / count, 2),
+            'peak_memory_kib': round(peak / 1024, 1),
+        }
+
+    def percentile(self, values, percent):
+        """Nearest rank percentile of sorted values"""
+        return values[max(0, math.ceil(len(values) * percent / 100) - 1)]
+
+    def get_commit(self):
+        """Return the current git commit, if the code is in a checkout"""
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+                stderr=subprocess.DEVNULL, universal_newlines=True
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
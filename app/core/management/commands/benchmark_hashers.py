@@ -0,0 +1,44 @@
+import os
+import time
+
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Django command to report how many password hashes per second a single
+    core manages with each configured hasher, to help size workers
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rounds', type=int, default=20,
+            help='Number of passwords to hash with each hasher'
+        )
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        cores = os.cpu_count() or 1
+        self.stdout.write('Hashing %d passwords per hasher, %d CPU cores' % (
+            rounds, cores
+        ))
+
+        for hasher in get_hashers():
+            try:
+                hasher.encode('benchmark', hasher.salt())
+            except ValueError as exc:
+                # The library of an optional hasher is not installed
+                self.stdout.write('%s: skipped (%s)' % (hasher.algorithm, exc))
+                continue
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                hasher.encode('benchmark', hasher.salt())
+            elapsed = time.perf_counter() - start
+
+            per_core = rounds / elapsed
+            self.stdout.write(
+                '%s: %.1f hashes/sec per core, %.1f hashes/sec on all cores'
+                % (hasher.algorithm, per_core, per_core * cores)
+            )
@@ -0,0 +1,90 @@
+import sys
+import time
+from collections import defaultdict
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from core.recipe_io import FORMATS, LIST_FIELDS, RecordWriter, guess_format
+
+
+class Command(BaseCommand):
+    """
+    Django command to export recipes with their tag and ingredient names
+    as NDJSON or CSV, which import_recipes reads back. Recipes are read
+    through a server side cursor and written a chunk at a time, so memory
+    stays flat whatever the number of recipes.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to write, - for stdout')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Guessed from the file extension by default')
+        parser.add_argument('--user',
+                            help='Only export the recipes of this email')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Recipes fetched from the cursor at a time')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        queryset = Recipe.objects.order_by('id')
+        if options['user']:
+            queryset = queryset.filter(user__email_add=options['user'])
+
+        stream = sys.stdout if path == '-' else open(path, 'w', newline='')
+        start = time.perf_counter()
+        exported = 0
+        try:
+            writer = RecordWriter(stream, fmt)
+            for record in self.iter_records(queryset, options['chunk_size']):
+                writer.write(record)
+                exported += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        elapsed = time.perf_counter() - start
+        # Keep the summary out of the exported data
+        out = self.stderr if path == '-' else self.stdout
+        out.write('Exported %d recipes in %.2fs (%.0f rows/sec)' % (
+            exported, elapsed, exported / elapsed if elapsed else 0
+        ))
+
+    def iter_records(self, queryset, chunk_size):
+        rows = queryset.values_list(
+            'id', 'user__email_add', 'title', 'time_minutes', 'price', 'link'
+        ).iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            recipe_ids = [row[0] for row in chunk]
+            names = {
+                relation: self.get_names(relation, recipe_ids)
+                for relation in LIST_FIELDS
+            }
+            for recipe_id, email, title, minutes, price, link in chunk:
+                yield {
+                    'user': email,
+                    'title': title,
+                    'time_minutes': minutes,
+                    'price': price,
+                    'link': link,
+                    'tags': names['tags'][recipe_id],
+                    'ingredients': names['ingredients'][recipe_id],
+                }
+
+    def get_names(self, relation, recipe_ids):
+        """Return the sorted names linked to each recipe, in one query"""
+        through = getattr(Recipe, relation).through
+        target = Recipe._meta.get_field(relation).m2m_reverse_field_name()
+        names = defaultdict(list)
+        for recipe_id, name in through.objects.filter(
+                recipe_id__in=recipe_ids
+        ).order_by('%s__name' % target).values_list(
+                'recipe_id', '%s__name' % target
+        ):
+            names[recipe_id].append(name)
+        return names
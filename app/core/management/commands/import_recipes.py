@@ -0,0 +1,184 @@
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Tag, Ingredient, Recipe
+from core.recipe_io import FORMATS, guess_format, read_records
+
+RELATIONS = (('tags', Tag), ('ingredients', Ingredient))
+
+
+class Command(BaseCommand):
+    """
+    Django command to import recipes from NDJSON or CSV, as written by
+    export_recipes. Tags and ingredients are matched by name for the owner
+    of each recipe and created when missing. Records are read as a stream
+    and committed a chunk at a time, so an import that fails keeps the
+    chunks committed before the failing record.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to read, - for stdin')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='Guessed from the file extension by default')
+        parser.add_argument(
+            '--user',
+            help='Email of the user owning every imported recipe, instead '
+                 'of the user field of each record'
+        )
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Records committed in one transaction')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows inserted by one query')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.user_ids = {}
+        # Name to id of the tags and ingredients of each user, by relation
+        self.name_ids = {relation: {} for relation, _ in RELATIONS}
+        self.valid_names = {relation: set() for relation, _ in RELATIONS}
+        owner_id = None
+        if options['user']:
+            owner_id = self.get_user_id(options['user'])
+
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        stream = sys.stdin if path == '-' else open(path, newline='')
+        start = time.perf_counter()
+        imported = 0
+        try:
+            records = (
+                self.parse(line_num, record, owner_id)
+                for line_num, record in self.read(stream, fmt)
+            )
+            while True:
+                chunk = list(islice(records, options['chunk_size']))
+                if not chunk:
+                    break
+                self.import_chunk(chunk)
+                imported += len(chunk)
+                if options['verbosity'] > 1:
+                    self.stdout.write('Committed %d recipes' % imported)
+        except CommandError as exc:
+            raise CommandError('%s (%d recipes were imported before)' % (
+                exc, imported
+            ))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write('Imported %d recipes in %.2fs (%.0f rows/sec)' % (
+            imported, elapsed, imported / elapsed if elapsed else 0
+        ))
+
+    def read(self, stream, fmt):
+        try:
+            yield from read_records(stream, fmt)
+        except ValueError as exc:
+            raise CommandError('Invalid %s: %s' % (fmt, exc))
+
+    def get_user_id(self, email):
+        if email not in self.user_ids:
+            user_id = get_user_model().objects.filter(
+                email_add=email
+            ).values_list('id', flat=True).first()
+            if user_id is None:
+                raise CommandError('No user with the email %s' % email)
+            self.user_ids[email] = user_id
+        return self.user_ids[email]
+
+    def parse(self, line_num, record, owner_id):
+        """Return the cleaned fields of a record"""
+        if not isinstance(record, dict):
+            raise CommandError('Line %d: expected an object' % line_num)
+        try:
+            user_id = owner_id or self.get_user_id(record.get('user'))
+            fields = {
+                name: Recipe._meta.get_field(name).clean(
+                    record.get(name), None
+                )
+                for name in ('title', 'time_minutes', 'price')
+            }
+            fields['link'] = Recipe._meta.get_field('link').clean(
+                record.get('link') or '', None
+            )
+            for relation, model in RELATIONS:
+                names = record.get(relation) or []
+                if not isinstance(names, list):
+                    raise ValidationError('%s must be a list' % relation)
+                # Repeated names link once
+                fields[relation] = list(dict.fromkeys(
+                    self.clean_name(relation, model, name) for name in names
+                ))
+        except ValidationError as exc:
+            raise CommandError('Line %d: %s' % (
+                line_num, '; '.join(exc.messages)
+            ))
+        except CommandError as exc:
+            raise CommandError('Line %d: %s' % (line_num, exc))
+        return dict(fields, user_id=user_id)
+
+    def clean_name(self, relation, model, name):
+        """Validate a tag or ingredient name the first time it is seen"""
+        name = str(name).strip()
+        if name not in self.valid_names[relation]:
+            model._meta.get_field('name').clean(name, None)
+            self.valid_names[relation].add(name)
+        return name
+
+    def import_chunk(self, chunk):
+        with transaction.atomic():
+            for relation, model in RELATIONS:
+                self.resolve_names(relation, model, chunk)
+
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    user_id=fields['user_id'], title=fields['title'],
+                    time_minutes=fields['time_minutes'],
+                    price=fields['price'], link=fields['link']
+                )
+                for fields in chunk
+            ], batch_size=self.batch_size)
+
+            for relation, _ in RELATIONS:
+                name_ids = self.name_ids[relation]
+                pairs = [
+                    (recipe.id, name_ids[fields['user_id']][name])
+                    for recipe, fields in zip(recipes, chunk)
+                    for name in fields[relation]
+                ]
+                for start in range(0, len(pairs), self.batch_size):
+                    Recipe.objects.bulk_link(
+                        relation, pairs[start:start + self.batch_size]
+                    )
+
+            Recipe.objects.after_bulk_load(
+                [recipe.id for recipe in recipes],
+                {fields['user_id'] for fields in chunk}
+            )
+
+    def resolve_names(self, relation, model, chunk):
+        """Load the names of new users and create the missing ones"""
+        name_ids = self.name_ids[relation]
+        missing = {}
+        for fields in chunk:
+            user_id = fields['user_id']
+            if user_id not in name_ids:
+                name_ids[user_id] = dict(model.objects.filter(
+                    user_id=user_id
+                ).values_list('name', 'id'))
+            for name in fields[relation]:
+                if name not in name_ids[user_id]:
+                    missing.setdefault((user_id, name), None)
+
+        created = model.objects.bulk_create([
+            model(user_id=user_id, name=name) for user_id, name in missing
+        ], batch_size=self.batch_size)
+        for obj in created:
+            name_ids[obj.user_id][obj.name] = obj.id
@@ -0,0 +1,51 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    """
+    Django command to run background jobs in worker threads, each with its
+    own database connection. SIGINT and SIGTERM stop the workers once their
+    current jobs are done.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Jobs run at once by this process')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds between checks for due jobs')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is due')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        previous = {
+            signum: signal.signal(signum, lambda *args: stop.set())
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        threads = [
+            threading.Thread(
+                target=jobs.work, name='job-worker-%d' % n,
+                args=(stop, options['poll_interval'], options['burst'])
+            )
+            for n in range(options['workers'])
+        ]
+        self.stdout.write('Running %d job workers for tasks: %s' % (
+            len(threads), ', '.join(sorted(jobs.TASKS))
+        ))
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                # Join with a timeout so signals reach the main thread
+                while thread.is_alive():
+                    thread.join(0.5)
+        finally:
+            stop.set()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write('Job workers stopped')
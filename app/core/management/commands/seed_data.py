@@ -0,0 +1,130 @@
+import random
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Tag, Ingredient, Recipe
+
+WORDS = (
+    'Spicy', 'Sweet', 'Smoky', 'Crispy', 'Creamy', 'Tangy', 'Herby', 'Zesty',
+    'Garlic', 'Lemon', 'Ginger', 'Chili', 'Honey', 'Coconut', 'Basil',
+    'Tomato', 'Mushroom', 'Chicken', 'Salmon', 'Tofu', 'Lentil', 'Potato',
+    'Curry', 'Soup', 'Salad', 'Stew', 'Pie', 'Noodles', 'Rice', 'Bread',
+)
+
+
+class Command(BaseCommand):
+    """
+    Django command to seed a reproducible synthetic dataset. Each user gets
+    the same number of tags, ingredients and recipes. Recipes draw their
+    tags and ingredients with a skewed popularity, like real collections
+    where a few tags are on most recipes.
+    """
+    batch_size = 5000
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--tags', type=int, default=50,
+                            help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=200,
+                            help='Ingredients per user')
+        parser.add_argument('--recipes', type=int, default=100,
+                            help='Recipes per user')
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed of the random generator')
+        parser.add_argument('--email-prefix', default='seed',
+                            help='Users are <prefix>-<n>@example.com')
+        parser.add_argument('--password', default='seed-password')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        emails = [
+            '%s-%d@example.com' % (options['email_prefix'], n)
+            for n in range(options['users'])
+        ]
+        if get_user_model().objects.filter(email_add__in=emails).exists():
+            raise CommandError(
+                'Users with the prefix %s already exist'
+                % options['email_prefix']
+            )
+
+        # Hashing once keeps seeding fast, every user gets the same hash
+        password = make_password(options['password'])
+        with transaction.atomic():
+            users = get_user_model().objects.bulk_create([
+                get_user_model()(
+                    email_add=email, name='Seed user %d' % n,
+                    password=password
+                )
+                for n, email in enumerate(emails)
+            ])
+            for user in users:
+                self.seed_user(user, rng, options)
+        Recipe.objects.analyze()
+
+        self.stdout.write('Seeded %d users with %d tags, %d ingredients and '
+                          '%d recipes each' % (
+                              len(users), options['tags'],
+                              options['ingredients'], options['recipes']
+                          ))
+
+    def seed_user(self, user, rng, options):
+        tags = Tag.objects.bulk_create([
+            Tag(user=user, name=self.name(rng, n))
+            for n in range(options['tags'])
+        ], batch_size=self.batch_size)
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(user=user, name=self.name(rng, n))
+            for n in range(options['ingredients'])
+        ], batch_size=self.batch_size)
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                user=user,
+                title='%s %s' % (self.name(rng, n), rng.choice(WORDS)),
+                time_minutes=rng.randint(5, 240),
+                price=Decimal(rng.randint(100, 50000)) / 100
+            )
+            for n in range(options['recipes'])
+        ], batch_size=self.batch_size)
+
+        for relation, fk, targets, per_recipe in (
+                ('tags', 'tag_id', tags, options['tags_per_recipe']),
+                ('ingredients', 'ingredient_id', ingredients,
+                 options['ingredients_per_recipe'])):
+            through = getattr(Recipe, relation).through
+            # Popularity falls with the rank of the target, as 1 / rank
+            cum_weights = list(accumulate(
+                1 / rank for rank in range(1, len(targets) + 1)
+            ))
+            through.objects.bulk_create([
+                through(recipe_id=recipe.id, **{fk: target.id})
+                for recipe in recipes
+                for target in self.pick(rng, targets, cum_weights, per_recipe)
+            ], batch_size=self.batch_size)
+
+        Recipe.objects.after_bulk_load(
+            [recipe.id for recipe in recipes], [user.id]
+        )
+
+    def name(self, rng, n):
+        """Return a readable name, made unique by its number"""
+        return '%s %s %d' % (rng.choice(WORDS), rng.choice(WORDS), n)
+
+    def pick(self, rng, population, cum_weights, mean):
+        """Pick around mean distinct items of the weighted population"""
+        if not population or mean <= 0:
+            return []
+        count = min(len(population), rng.randint(1, 2 * mean - 1))
+        picked = set()
+        while len(picked) < count:
+            picked.update(rng.choices(
+                range(len(population)), cum_weights=cum_weights,
+                k=count - len(picked)
+            ))
+        return [population[index] for index in sorted(picked)]
@@ -1,20 +1,69 @@
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from django.db import connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to pause execution till the database is ready"""
+    initial_delay = 0.05
+    max_delay = 2.0
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help='Database alias to wait for, can be repeated '
+                 '(defaults to "default")'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=60.0,
+            help='Seconds to wait before giving up'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write('Waiting for DB...')
-        db_conn = None
-        while not db_conn:
+        aliases = options['databases'] or ['default']
+        deadline = time.monotonic() + options['timeout']
+
+        with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+            futures = [
+                executor.submit(self.wait_for, alias, deadline)
+                for alias in aliases
+            ]
+            for future in futures:
+                future.result()
+        self.stdout.write(self.style.SUCCESS('Connected to Database'))
+
+    def wait_for(self, alias, deadline):
+        """
+        Retry until the database accepts queries, sleeping with jittered
+        exponential backoff in between
+        """
+        delay = self.initial_delay
+        while True:
             try:
-                db_conn = connections["default"]
+                self.ping(alias)
+                return
             except OperationalError:
-                self.stdout.write('DB unavailable. Waiting 1 sec...')
-                time.sleep(1)
-        self.stdout.write(self.style.SUCCESS('Connected to Database'))
+                pause = random.uniform(delay / 2, delay)
+                if time.monotonic() + pause > deadline:
+                    raise CommandError(
+                        'DB "%s" unavailable, giving up' % alias
+                    )
+                self.stdout.write('DB "%s" unavailable. Waiting %d ms...' % (
+                    alias, pause * 1000
+                ))
+                time.sleep(pause)
+                delay = min(delay * 2, self.max_delay)
+
+    def ping(self, alias):
+        """Open a real connection and run a trivial query on it"""
+        conn = connections[alias]
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        finally:
+            conn.close()
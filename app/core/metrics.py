@@ -0,0 +1,151 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+_local = threading.local()
+
+
+class Histogram:
+    """
+    Histogram over exponential buckets, each 25% wider than the previous
+    one, so percentiles are read back within 25% of the recorded values
+    """
+    bounds = [0.01 * 1.25 ** i for i in range(80)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """Return the upper bound of the bucket holding the percentile"""
+        if not self.count:
+            return None
+        rank = self.count * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index == len(self.bounds):
+                    return self.max
+                return min(self.bounds[index], self.max)
+        return self.max
+
+
+class RouteMetrics:
+    """Latency, database and serializer timings of one route"""
+    percentiles = (50, 90, 99)
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_time = Histogram()
+        self.serializer_time = Histogram()
+        self.queries = 0
+        self.max_queries = 0
+
+    def record(self, recorder, latency):
+        self.latency.record(latency)
+        self.db_time.record(recorder.db_time)
+        self.serializer_time.record(recorder.serializer_time)
+        self.queries += recorder.queries
+        self.max_queries = max(self.max_queries, recorder.queries)
+
+    def summary(self):
+        summary = OrderedDict([('count', self.latency.count)])
+        for name, histogram in (('latency_ms', self.latency),
+                                ('db_ms', self.db_time),
+                                ('serializer_ms', self.serializer_time)):
+            summary[name] = OrderedDict(
+                ('p%d' % p, round(histogram.percentile(p), 3))
+                for p in self.percentiles
+            )
+        summary['queries'] = OrderedDict([
+            ('mean', round(self.queries / self.latency.count, 2)),
+            ('max', self.max_queries),
+        ])
+        return summary
+
+
+class MetricsRegistry:
+    """Per route metrics of the sampled requests of this process"""
+
+    def __init__(self):
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, recorder, latency):
+        with self._lock:
+            if route not in self.routes:
+                self.routes[route] = RouteMetrics()
+            self.routes[route].record(recorder, latency)
+
+    def summary(self):
+        with self._lock:
+            return OrderedDict(
+                (route, self.routes[route].summary())
+                for route in sorted(self.routes)
+            )
+
+    def clear(self):
+        with self._lock:
+            self.routes.clear()
+
+
+registry = MetricsRegistry()
+
+
+class RequestRecorder:
+    """
+    Collects the database and serializer timings of the request running in
+    the current thread. Times are in milliseconds.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.in_serializer = False
+
+    def __enter__(self):
+        _local.recorder = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.recorder = None
+
+    def record_query(self, execute, sql, params, many, context):
+        """Database execute wrapper timing every query"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += (time.perf_counter() - start) * 1000
+
+
+class TimedSerializerMixin:
+    """
+    Adds the time spent representing objects to the recorder of the
+    current request. Nested serializers are only timed by the outermost.
+    """
+
+    def to_representation(self, instance):
+        recorder = getattr(_local, 'recorder', None)
+        if recorder is None or recorder.in_serializer:
+            return super().to_representation(instance)
+
+        recorder.in_serializer = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            recorder.serializer_time += (time.perf_counter() - start) * 1000
+            recorder.in_serializer = False
@@ -0,0 +1,119 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core import routers
+from core.metrics import RequestRecorder, registry
+from core.query_budget import QueryBudget
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, query count, database time and serializer time of a
+    sample of the requests, per route, and report them to the client in a
+    Server-Timing header. Requests left out of the sample only cost one
+    random number.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.REQUEST_METRICS['SAMPLE_RATE']
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with RequestRecorder() as recorder, ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(
+                    conn.execute_wrapper(recorder.record_query)
+                )
+            response = self.get_response(request)
+        latency = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        if match is not None:
+            route = '%s %s' % (request.method, match.view_name)
+            registry.record(route, recorder, latency)
+        response['Server-Timing'] = (
+            'db;dur=%.3f;desc="%d queries", serializer;dur=%.3f, '
+            'total;dur=%.3f' % (
+                recorder.db_time, recorder.queries,
+                recorder.serializer_time, latency
+            )
+        )
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Log a warning with the offending stack when a request goes over the
+    query budget of its view, the query_budget attribute of the view class,
+    or runs the same query shape too many times. Meant for staging.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = settings.QUERY_BUDGET
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        request.query_budget = QueryBudget(
+            config['MAX_QUERIES'], config['MAX_REPEATS'], raise_errors=False
+        )
+        with request.query_budget as budget:
+            response = self.get_response(request)
+        for violation in budget.violations():
+            logger.warning(
+                'Query budget exceeded by %s %s: %s',
+                request.method, request.path, violation
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = getattr(request, 'query_budget', None)
+        view_class = getattr(view_func, 'cls', None)
+        if budget is not None and hasattr(view_class, 'query_budget'):
+            budget.max_queries = view_class.query_budget
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let the reads of GET, HEAD and OPTIONS requests go to the replicas, see
+    core.routers.ReplicaRouter, and pin the client to the primary after a
+    successful write so it reads its own writes. Views setting
+    replica_reads = False always read from the primary.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        routers.check_pin_cache()
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        safe = request.method in self.safe_methods
+        routers.begin_request(request, replica_reads=safe)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request()
+        if not safe and response.status_code < 400:
+            routers.pin_to_primary(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        if getattr(view_class, 'replica_reads', True) is False:
+            routers.use_primary()
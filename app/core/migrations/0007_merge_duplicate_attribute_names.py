@@ -0,0 +1,50 @@
+# Generated by Django 2.1.15 on 2026-10-18 02:11
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """
+    Collapse tags and ingredients sharing a name for the same user into the
+    oldest row, moving their recipe links over before the duplicates go
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+
+    for model_name, relation in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, relation).through
+        fk = '%s_id' % model_name.lower()
+
+        groups = model.objects.values('user_id', 'name').annotate(
+            keep=Min('id'), total=Count('id')
+        ).filter(total__gt=1)
+
+        for group in groups:
+            duplicate_ids = list(model.objects.filter(
+                user_id=group['user_id'], name=group['name']
+            ).exclude(id=group['keep']).values_list('id', flat=True))
+
+            linked = set(through.objects.filter(
+                **{fk: group['keep']}
+            ).values_list('recipe_id', flat=True))
+            for row in through.objects.filter(**{fk + '__in': duplicate_ids}):
+                if row.recipe_id in linked:
+                    row.delete()
+                else:
+                    setattr(row, fk, group['keep'])
+                    row.save()
+                    linked.add(row.recipe_id)
+
+            model.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tag_ingredient_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.1.15 on 2026-10-18 02:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_link_covering_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='collectionversion',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
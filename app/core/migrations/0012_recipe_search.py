@@ -0,0 +1,67 @@
+# Generated by Django 2.1.15 on 2026-10-18 02:24
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+BACKFILL_SEARCH_VECTOR = """
+    UPDATE core_recipe AS r SET search_vector =
+        setweight(to_tsvector('english', r.title), 'A') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(t.name, ' ')
+            FROM core_tag t
+            JOIN core_recipe_tags rt ON rt.tag_id = t.id
+            WHERE rt.recipe_id = r.id
+        ), '')), 'B') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(i.name, ' ')
+            FROM core_ingredient i
+            JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+            WHERE ri.recipe_id = r.id
+        ), '')), 'C')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_collection_version_user_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search__c01407_gin'),
+        ),
+        migrations.RunSQL(BACKFILL_SEARCH_VECTOR, migrations.RunSQL.noop),
+        django.contrib.postgres.operations.TrigramExtension(),
+        # Trigram indexes serve both the case insensitive prefix match and
+        # the typo tolerant similarity match of the autocomplete search
+        migrations.RunSQL(
+            'CREATE INDEX core_tag_name_upper_trgm ON core_tag '
+            'USING gin (UPPER(name) gin_trgm_ops)',
+            'DROP INDEX core_tag_name_upper_trgm',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_tag_name_trgm ON core_tag '
+            'USING gin (name gin_trgm_ops)',
+            'DROP INDEX core_tag_name_trgm',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_ingredient_name_upper_trgm ON core_ingredient '
+            'USING gin (UPPER(name) gin_trgm_ops)',
+            'DROP INDEX core_ingredient_name_upper_trgm',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_ingredient_name_trgm ON core_ingredient '
+            'USING gin (name gin_trgm_ops)',
+            'DROP INDEX core_ingredient_name_trgm',
+        ),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
@@ -53,6 +57,14 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'name')
+        # Matches the keyset pagination order of the list endpoint
+        indexes = [
+            models.Index(fields=['user', 'name', 'id']),
+        ]
 
     def __str__(self):
         return self.name
@@ -65,11 +77,160 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'name')
+        # Matches the keyset pagination order of the list endpoint
+        indexes = [
+            models.Index(fields=['user', 'name', 'id']),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeManager(models.Manager):
+    # Title words rank above tag names, which rank above ingredient names.
+    # Names are gathered from the link rows of the target recipes in one
+    # pass, rather than by a subquery per recipe whose plan depends on
+    # fresh statistics after bulk loads.
+    search_vector_sql = """
+        WITH target AS ({target}),
+        tags AS (
+            SELECT rt.recipe_id, string_agg(t.name, ' ') AS names
+            FROM core_recipe_tags rt
+            JOIN core_tag t ON t.id = rt.tag_id
+            WHERE rt.recipe_id IN (SELECT id FROM target)
+            GROUP BY rt.recipe_id
+        ),
+        ingredients AS (
+            SELECT ri.recipe_id, string_agg(i.name, ' ') AS names
+            FROM core_recipe_ingredients ri
+            JOIN core_ingredient i ON i.id = ri.ingredient_id
+            WHERE ri.recipe_id IN (SELECT id FROM target)
+            GROUP BY ri.recipe_id
+        )
+        UPDATE core_recipe AS r SET search_vector =
+            setweight(to_tsvector('english', r.title), 'A') ||
+            setweight(to_tsvector('english', coalesce(tags.names, '')), 'B') ||
+            setweight(
+                to_tsvector('english', coalesce(ingredients.names, '')), 'C'
+            )
+        FROM target
+        LEFT JOIN tags ON tags.recipe_id = target.id
+        LEFT JOIN ingredients ON ingredients.recipe_id = target.id
+        WHERE r.id = target.id
+    """
+
+    def update_search_vector(self, recipe_ids=None):
+        """
+        Rebuild the search vector of the given recipes, or of every recipe,
+        in a single statement
+        """
+        with connection.cursor() as cursor:
+            if recipe_ids is None:
+                cursor.execute(self.search_vector_sql.format(
+                    target='SELECT id FROM core_recipe'
+                ))
+            else:
+                cursor.execute(
+                    self.search_vector_sql.format(
+                        target='SELECT DISTINCT unnest(%s::integer[]) AS id'
+                    ),
+                    [list(recipe_ids)]
+                )
+
+    def analyze(self):
+        """
+        Refresh the planner statistics of recipes, their tags and their
+        ingredients. This reads every row of those tables, so it is only run
+        once after seeding, not for every import.
+        """
+        tables = [self.model._meta.db_table]
+        for field in self.model._meta.many_to_many:
+            tables += [
+                field.m2m_db_table(), field.remote_field.model._meta.db_table
+            ]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE %s' % ', '.join(
+                connection.ops.quote_name(table) for table in tables
+            ))
+
+    def after_bulk_load(self, recipe_ids, user_ids):
+        """
+        Do what the signal receivers would have done for recipes created and
+        linked in bulk, which sends no signals: rebuild the search vectors of
+        the recipes and bump the tag and ingredient versions of their users
+        """
+        self.update_search_vector(recipe_ids)
+        for user_id in user_ids:
+            for field in self.model._meta.many_to_many:
+                CollectionVersion.objects.bump(
+                    user_id, field.related_model._meta.model_name
+                )
+
+    def link_table(self, relation):
+        """Return the quoted through table and columns of a relation"""
+        field = self.model._meta.get_field(relation)
+        qn = connection.ops.quote_name
+        return {
+            'table': qn(field.m2m_db_table()),
+            'recipe': qn(field.m2m_column_name()),
+            'target': qn(field.m2m_reverse_name()),
+        }
+
+    def bulk_link(self, relation, pairs):
+        """
+        Link recipes to tags or ingredients from (recipe id, target id)
+        pairs with one statement, skipping the model instances and per row
+        parameters of bulk_create on the through table
+        """
+        recipe_ids, target_ids = zip(*pairs) if pairs else ((), ())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} ({recipe}, {target}) '
+                'SELECT * FROM unnest(%s::integer[], %s::integer[])'.format(
+                    **self.link_table(relation)
+                ),
+                [list(recipe_ids), list(target_ids)]
+            )
+
+    def add_links(self, relation, recipe_ids, target_ids):
+        """
+        Link every recipe to every target in one statement, leaving the
+        existing links alone. Return the recipe id of every new link.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} ({recipe}, {target}) '
+                'SELECT r, t FROM unnest(%s::integer[]) AS r, '
+                'unnest(%s::integer[]) AS t '
+                'ON CONFLICT DO NOTHING RETURNING {recipe}'.format(
+                    **self.link_table(relation)
+                ),
+                [list(recipe_ids), list(target_ids)]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def remove_links(self, relation, recipe_ids, target_ids, keep=False):
+        """
+        Unlink the recipes from the targets in one statement, or from every
+        other target when keep is set. Return the recipe id of every removed
+        link.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM {table} WHERE {recipe} = ANY(%s) '
+                'AND {negate}{target} = ANY(%s) RETURNING {recipe}'.format(
+                    negate='NOT ' if keep else '',
+                    **self.link_table(relation)
+                ),
+                [list(recipe_ids), list(target_ids)]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
 class Recipe(models.Model):
     """Recipe model for recipe"""
     title = models.CharField(max_length=255)
@@ -83,6 +244,118 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
+    # Kept up to date from the title, tag names and ingredient names
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector']),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class CollectionVersionManager(models.Manager):
+
+    def bump(self, user_id, collection):
+        """
+        Record a change to one of the collections of a user, with a single
+        upsert so concurrent first changes each count
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} (user_id, collection, version, '
+                'updated_at) VALUES (%s, %s, 1, %s) '
+                'ON CONFLICT (user_id, collection) DO UPDATE SET '
+                'version = {table}.version + 1, '
+                'updated_at = EXCLUDED.updated_at'.format(
+                    table=connection.ops.quote_name(self.model._meta.db_table)
+                ),
+                [user_id, collection, timezone.now()]
+            )
+
+    def current(self, user_id, collection):
+        """
+        Return the version of a collection of a user and when it last
+        changed, or (0, None) if it never changed
+        """
+        row = self.filter(user_id=user_id, collection=collection).values_list(
+            'version', 'updated_at'
+        ).first()
+        return row or (0, None)
+
+
+class CollectionVersion(models.Model):
+    """
+    Counter bumped on every write to one collection of a user, such as
+    their tags, so list responses can be validated without reading them
+    """
+    # Deleting a user deletes its tags and ingredients, whose signals bump
+    # these rows again, so they are only removed once the user is gone
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING
+    )
+    collection = models.CharField(max_length=50)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    objects = CollectionVersionManager()
+
+    class Meta:
+        unique_together = ('user', 'collection')
+
+    def __str__(self):
+        return '%s v%d' % (self.collection, self.version)
+
+
+class Job(models.Model):
+    """Background job run by the workers of run_workers, see core.jobs"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    task = models.CharField(max_length=100)
+    payload = JSONField(default=dict, blank=True)
+    # Jobs outlive their user, such as the one deleting the account
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL
+    )
+    status = models.CharField(max_length=20, choices=STATUSES,
+                              default=QUEUED)
+    priority = models.IntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=1)
+    run_after = models.DateTimeField(default=timezone.now)
+    # A running job whose lease expired is taken to have lost its worker
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    # Reported by long running tasks, see core.jobs.set_progress
+    progress = JSONField(null=True, blank=True)
+    result = JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Matches the order in which workers claim queued jobs
+            models.Index(fields=['status', '-priority', 'run_after', 'id']),
+            models.Index(fields=['status', 'lease_expires_at']),
+        ]
+
+    def __str__(self):
+        return '%s #%s (%s)' % (self.task, self.pk, self.status)
@@ -0,0 +1,82 @@
+import os
+import re
+import traceback
+from collections import Counter
+from contextlib import ContextDecorator, ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+# Numbers and runs of placeholders vary between queries of the same shape
+NUMBER_RE = re.compile(r'\b\d+\b')
+PLACEHOLDERS_RE = re.compile(r'%s(, %s)+')
+
+
+def query_shape(sql):
+    """Return the SQL with its literal numbers and IN lists normalized"""
+    return PLACEHOLDERS_RE.sub('%s, ...', NUMBER_RE.sub('N', sql))
+
+
+def project_stack():
+    """Return the formatted frames of the call stack inside the project"""
+    here = os.path.abspath(__file__)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(settings.BASE_DIR) and
+        os.path.abspath(frame.filename) != here
+    ]
+    return ''.join(traceback.format_list(frames))
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudget(ContextDecorator):
+    """
+    Context manager and decorator failing when the code it wraps runs more
+    than max_queries queries, or the same query shape more than
+    max_repeats times, the usual sign of an N+1 pattern. The stack of the
+    first repeat over the limit is kept to show where the loop is.
+    """
+
+    def __init__(self, max_queries=None, max_repeats=1, raise_errors=True):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.raise_errors = raise_errors
+
+    def __enter__(self):
+        self.queries = 0
+        self.shapes = Counter()
+        self.stacks = {}
+        self._stack = ExitStack()
+        for conn in connections.all():
+            self._stack.enter_context(conn.execute_wrapper(self.record))
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._stack.close()
+        if exc_type is None and self.raise_errors and self.violations():
+            raise QueryBudgetExceeded('\n\n'.join(self.violations()))
+
+    def record(self, execute, sql, params, many, context):
+        self.queries += 1
+        shape = query_shape(sql)
+        self.shapes[shape] += 1
+        if self.max_repeats is not None and \
+                self.shapes[shape] == self.max_repeats + 1:
+            self.stacks[shape] = project_stack()
+        return execute(sql, params, many, context)
+
+    def violations(self):
+        """Return a description of every limit that was exceeded"""
+        found = []
+        if self.max_queries is not None and self.queries > self.max_queries:
+            found.append('%d queries run, the budget is %d' % (
+                self.queries, self.max_queries
+            ))
+        for shape, stack in self.stacks.items():
+            found.append('Query run %d times, at most %d allowed: %s\n%s' % (
+                self.shapes[shape], self.max_repeats, shape, stack
+            ))
+        return found
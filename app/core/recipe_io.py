@@ -0,0 +1,91 @@
+import csv
+import json
+import re
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# One record per recipe. In CSV the tag and ingredient names of a recipe
+# share one cell, separated by LIST_SEPARATOR, with LIST_ESCAPE before any
+# separator or escape inside a name.
+FIELDS = (
+    'user', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients'
+)
+LIST_FIELDS = ('tags', 'ingredients')
+LIST_SEPARATOR = '|'
+LIST_ESCAPE = '\\'
+FORMATS = ('ndjson', 'csv')
+
+# An escaped character, a separator, or a run of other characters
+LIST_TOKEN = re.compile(
+    r'{escape}(.)|({separator})|([^{escape}{separator}]+)'.format(
+        escape=re.escape(LIST_ESCAPE), separator=re.escape(LIST_SEPARATOR)
+    ),
+    re.DOTALL
+)
+
+
+def guess_format(path):
+    """Return the format matching the extension of a path, ndjson otherwise"""
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def join_names(names):
+    """Return the CSV cell listing names"""
+    return LIST_SEPARATOR.join(
+        name.replace(LIST_ESCAPE, LIST_ESCAPE * 2).replace(
+            LIST_SEPARATOR, LIST_ESCAPE + LIST_SEPARATOR
+        )
+        for name in names
+    )
+
+
+def split_names(cell):
+    """Return the names listed in a CSV cell, skipping blank ones"""
+    names = ['']
+    for escaped, separator, text in LIST_TOKEN.findall(cell):
+        if separator:
+            names.append('')
+        else:
+            names[-1] += escaped or text
+    return [name for name in names if name.strip()]
+
+
+def read_records(stream, fmt):
+    """Yield the line number and the fields of every record in a stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            for field in LIST_FIELDS:
+                record[field] = split_names(record.get(field) or '')
+            yield reader.line_num, record
+    else:
+        for line_num, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                raise ValueError('line %d: %s' % (line_num, exc))
+            yield line_num, record
+
+
+class RecordWriter:
+    """Write records to a stream, one line at a time"""
+
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(stream, FIELDS)
+            self.writer.writeheader()
+
+    def write(self, record):
+        if self.fmt == 'csv':
+            self.writer.writerow(dict(record, **{
+                field: join_names(record[field])
+                for field in LIST_FIELDS
+            }))
+        else:
+            self.stream.write(
+                json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+            )
@@ -0,0 +1,123 @@
+import random
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_pin'
+
+_state = threading.local()
+
+
+def check_pin_cache():
+    """
+    Refuse a pin cache local to each process: the next read of a writer
+    usually reaches another worker, which would not know about the pin
+    """
+    cache = caches[settings.REPLICA_ROUTING['PIN_CACHE']]
+    if settings.DATABASE_REPLICAS and isinstance(
+            cache, (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            'REPLICA_ROUTING PIN_CACHE must name a cache shared by all '
+            'workers when DATABASE_REPLICAS are set'
+        )
+
+
+def begin_request(request, replica_reads):
+    """
+    Start routing the queries of a request run by this thread. One replica
+    serves all its reads, so they see the data as of the same moment.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    _state.request = request
+    _state.replica_reads = replica_reads
+    _state.replica = random.choice(replicas) if replicas else None
+    # None until the pin cache is checked, once the user is known
+    _state.pinned = True if PIN_COOKIE in request.COOKIES else None
+
+
+def end_request():
+    _state.request = None
+    _state.replica_reads = False
+
+
+def use_primary():
+    """Send the remaining reads of the current request to the primary"""
+    _state.replica_reads = False
+
+
+def pin_key(user_id):
+    return 'primary-pin:%s' % user_id
+
+
+def request_user(request):
+    """
+    Return the user once authentication has set a real one on the request.
+    The lazy session user is left alone, evaluating it would run a query.
+    """
+    user = request.__dict__.get('user')
+    return user if isinstance(user, get_user_model()) else None
+
+
+def pin_to_primary(request, response):
+    """
+    Send the reads of the writer to the primary for PIN_SECONDS, until the
+    replicas have caught up with the write: by user in the pin cache, and
+    by cookie for clients that are not logged in
+    """
+    config = settings.REPLICA_ROUTING
+    user = request_user(request)
+    if user is not None:
+        caches[config['PIN_CACHE']].set(
+            pin_key(user.pk), True, config['PIN_SECONDS']
+        )
+    response.set_cookie(
+        PIN_COOKIE, '1', max_age=config['PIN_SECONDS'], httponly=True
+    )
+
+
+def is_pinned():
+    if _state.pinned is None:
+        user = request_user(_state.request)
+        if user is None:
+            return False
+        _state.pinned = bool(caches[
+            settings.REPLICA_ROUTING['PIN_CACHE']
+        ].get(pin_key(user.pk)))
+    return _state.pinned
+
+
+class ReplicaRouter:
+    """
+    Route the reads of safe requests to the replica picked for the request
+    and everything else to the primary. Reads stay on the primary inside a
+    transaction on it, for models listed in PRIMARY_MODELS and for users
+    who wrote recently. Queries outside a request, such as in management
+    commands, always use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not getattr(_state, 'replica_reads', False):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        primary_models = settings.REPLICA_ROUTING['PRIMARY_MODELS']
+        if model._meta.label_lower in primary_models or is_pinned():
+            return DEFAULT_DB_ALIAS
+        return _state.replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
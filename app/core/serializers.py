@@ -0,0 +1,50 @@
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import serializers
+
+from core import jobs
+from core.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for enqueuing a background job and reading its status"""
+
+    class Meta:
+        model = Job
+        fields = ('id', 'task', 'payload', 'priority', 'status', 'attempts',
+                  'max_attempts', 'progress', 'result', 'error',
+                  'created_at', 'started_at', 'finished_at')
+        read_only_fields = ('id', 'status', 'attempts', 'max_attempts',
+                            'progress', 'result', 'error', 'created_at',
+                            'started_at', 'finished_at')
+        extra_kwargs = {'priority': {'required': False}}
+
+    def validate_task(self, value):
+        """Accept the tasks the requesting user may enqueue"""
+        task = jobs.TASKS.get(value)
+        if task is None or not (task.public or self.is_staff()):
+            raise serializers.ValidationError(_('Unknown task'))
+        return value
+
+    def validate_payload(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError(_('Expected an object'))
+        return value
+
+    def validate_priority(self, value):
+        """Only let staff jump the queue"""
+        if not self.is_staff():
+            raise serializers.ValidationError(
+                _('Only staff can set the priority')
+            )
+        return value
+
+    def is_staff(self):
+        return self.context['request'].user.is_staff
+
+    def create(self, validated_data):
+        return jobs.enqueue(
+            validated_data['task'],
+            payload=validated_data.get('payload'),
+            user=self.context['request'].user,
+            priority=validated_data.get('priority')
+        )
@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, \
+                                     post_save, pre_delete
+from django.dispatch import receiver
+
+from core.models import CollectionVersion, Ingredient, Recipe, Tag
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_collection_version(sender, instance, **kwargs):
+    """Mark the collection of the saved or deleted object as changed"""
+    CollectionVersion.objects.bump(instance.user_id, sender._meta.model_name)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_linked_collection_version(sender, instance, action, model,
+                                   **kwargs):
+    """
+    Mark tags or ingredients as changed when recipes gain or lose them,
+    since that changes which of them are assigned
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if model is Recipe:
+            # Changed from the tag or ingredient side of the relation
+            collection = instance._meta.model_name
+        else:
+            collection = model._meta.model_name
+        CollectionVersion.objects.bump(instance.user_id, collection)
+
+
+@receiver(post_delete, sender=Recipe)
+def bump_recipe_collections_version(sender, instance, **kwargs):
+    """Mark tags and ingredients as changed when a recipe goes away"""
+    for model in (Tag, Ingredient):
+        CollectionVersion.objects.bump(
+            instance.user_id, model._meta.model_name
+        )
+
+
+@receiver(post_delete, sender=get_user_model())
+def delete_collection_versions(sender, instance, **kwargs):
+    """Remove the collection versions of a deleted user"""
+    CollectionVersion.objects.filter(user_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Recipe)
+def update_saved_recipe_search_vector(sender, instance, **kwargs):
+    """Index the new title of a saved recipe for search"""
+    Recipe.objects.update_search_vector([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_linked_recipe_search_vector(sender, instance, action, model,
+                                       pk_set, **kwargs):
+    """Index the tag and ingredient names of recipes whose links changed"""
+    if action == 'pre_clear' and model is Recipe:
+        # The recipes losing the link are unknown once it is cleared
+        instance._cleared_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if model is not Recipe:
+        recipe_ids = [instance.pk]
+    elif action == 'post_clear':
+        recipe_ids = instance._cleared_recipe_ids
+    else:
+        recipe_ids = pk_set
+    Recipe.objects.update_search_vector(recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def update_renamed_attribute_search_vector(sender, instance, created,
+                                           **kwargs):
+    """Index the new name of a tag or ingredient in its recipes"""
+    if not created:
+        Recipe.objects.update_search_vector(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_attribute_recipes(sender, instance, **kwargs):
+    """Remember the recipes of a tag or ingredient about to be deleted"""
+    instance._deleted_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def update_deleted_attribute_search_vector(sender, instance, **kwargs):
+    """Drop the name of a deleted tag or ingredient from its recipes"""
+    Recipe.objects.update_search_vector(instance._deleted_recipe_ids)
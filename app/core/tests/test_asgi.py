@@ -0,0 +1,263 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.asgi import ASGIHandler
+from core.tests.utils import benchmark, median
+
+
+def run_asgi(application, scope, messages):
+    """
+    Drive an ASGI application with the given request messages and return
+    the messages it sent back
+    """
+    sent = []
+    queue = list(messages)
+
+    async def receive():
+        if queue:
+            return queue.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(application(scope, receive, send))
+    finally:
+        loop.close()
+    return sent
+
+
+def http_scope(path, method='GET', query_string=b'', headers=()):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'root_path': '',
+        'query_string': query_string,
+        'headers': list(headers),
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 5000),
+    }
+
+
+class ASGIHandlerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.environ = None
+
+        def echo(environ, start_response):
+            self.environ = environ
+            start_response('201 Created', [('Content-Type', 'text/plain')])
+            return [environ['wsgi.input'].read()]
+
+        self.handler = ASGIHandler(echo, 2)
+
+    def test_request_translated_to_wsgi(self):
+        """Test that the scope and body reach the WSGI application"""
+        sent = run_asgi(self.handler, http_scope(
+            '/api/café/', 'POST', b'a=1',
+            [(b'content-type', b'text/plain'),
+             (b'x-tag', b'one'), (b'x-tag', b'two')]
+        ), [
+            {'type': 'http.request', 'body': b'hello ', 'more_body': True},
+            {'type': 'http.request', 'body': b'world'},
+        ])
+
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertEqual(sent[0]['headers'], [
+            (b'content-type', b'text/plain')
+        ])
+        self.assertEqual(sent[1]['body'], b'hello world')
+        self.assertEqual(self.environ['REQUEST_METHOD'], 'POST')
+        self.assertEqual(
+            self.environ['PATH_INFO'].encode('latin-1').decode('utf-8'),
+            '/api/café/'
+        )
+        self.assertEqual(self.environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(self.environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(self.environ['HTTP_X_TAG'], 'one,two')
+
+    def test_disconnect_before_body(self):
+        """Test that nothing runs when the client leaves mid request"""
+        sent = run_asgi(self.handler, http_scope('/', 'POST'), [
+            {'type': 'http.request', 'body': b'part', 'more_body': True},
+            {'type': 'http.disconnect'},
+        ])
+
+        self.assertEqual(sent, [])
+        self.assertIsNone(self.environ)
+
+    def test_streaming_response_sent_by_chunk(self):
+        """Test that a streaming response is sent one chunk at a time"""
+        def stream(environ, start_response):
+            response = StreamingHttpResponse(iter([b'[', b'1', b']']))
+            start_response('200 OK', list(response.items()))
+            return response
+
+        sent = run_asgi(ASGIHandler(stream, 1), http_scope('/'), [
+            {'type': 'http.request', 'body': b''},
+        ])
+
+        self.assertEqual([m.get('body') for m in sent[1:]],
+                         [b'[', b'1', b']', b''])
+        self.assertTrue(all(m['more_body'] for m in sent[1:-1]))
+
+    def test_django_application(self):
+        """Test serving a Django view through the handler"""
+        handler = ASGIHandler(get_wsgi_application(), 1)
+
+        sent = run_asgi(handler, http_scope(reverse('recipe:tag-list')), [
+            {'type': 'http.request', 'body': b''},
+        ])
+
+        self.assertEqual(sent[0]['status'], 401)
+
+    def test_lifespan(self):
+        """Test that the lifespan protocol is acknowledged"""
+        sent = run_asgi(self.handler, {'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'},
+            {'type': 'lifespan.shutdown'},
+        ])
+
+        self.assertEqual([m['type'] for m in sent], [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ])
+
+
+@benchmark
+class ConcurrencyBenchmark(TransactionTestCase):
+    """
+    Hold BENCHMARK_CONNECTIONS (1000 by default) slow clients open against
+    the WSGI and the ASGI entry points, each served by the same number of
+    gunicorn workers, and time the tag list for a client arriving after
+    them. Behind ASGI, that client must be served within its target.
+    """
+    connections = int(os.environ.get('BENCHMARK_CONNECTIONS', 1000))
+    probe_target_ms = float(os.environ.get('ASGI_PROBE_TARGET_MS', 500))
+    workers = 2
+    probes = 10
+    probe_timeout = 5
+    servers = (
+        ('wsgi', ['app.wsgi']),
+        ('asgi', ['-k', 'uvicorn.workers.UvicornWorker', 'app.asgi']),
+    )
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email_add="bench@firstapp.com",
+            password="benchmark"
+        )
+        self.token = Token.objects.create(user=user).key
+
+    def start_server(self, args):
+        """Start gunicorn on a free port and wait until it accepts"""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        env = dict(os.environ, DB_NAME=connection.settings_dict['NAME'])
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(self.workers),
+             '--bind', '127.0.0.1:%d' % port, '--log-level', 'warning'] +
+            args,
+            cwd=settings.BASE_DIR, env=env
+        )
+        self.addCleanup(server.wait)
+        self.addCleanup(server.terminate)
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port)).close()
+                return port
+            except OSError:
+                time.sleep(0.1)
+        self.fail('Server did not start')
+
+    def request_head(self, port):
+        return (
+            'GET %s HTTP/1.1\r\nHost: 127.0.0.1:%d\r\n'
+            'Authorization: Token %s\r\nConnection: close\r\n' % (
+                reverse('recipe:tag-list'), port, self.token
+            )
+        ).encode('ascii')
+
+    async def fetch(self, port, reader=None, writer=None):
+        """Finish a request, opening it first if needed, and read the status"""
+        if writer is None:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(self.request_head(port))
+        writer.write(b'\r\n')
+        try:
+            return (await reader.read())[9:12]
+        finally:
+            writer.close()
+
+    async def run_scenario(self, port):
+        slow = []
+        for _ in range(self.connections):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            # Headers without the closing blank line, like a stalled client
+            writer.write(self.request_head(port))
+            slow.append((reader, writer))
+        await asyncio.sleep(1)
+
+        latencies = []
+        for _ in range(self.probes):
+            start = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(
+                    self.fetch(port), self.probe_timeout
+                )
+            except asyncio.TimeoutError:
+                status = None
+            latencies.append(time.perf_counter() - start)
+            self.assertIn(status, (b'200', None))
+
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*[
+            self.fetch(port, reader, writer) for reader, writer in slow
+        ], return_exceptions=True)
+        drain = time.perf_counter() - start
+        return (
+            median(latencies) * 1000,
+            sum(latency >= self.probe_timeout for latency in latencies),
+            statuses.count(b'200'),
+            drain
+        )
+
+    def test_slow_client_concurrency(self):
+        """Check probe latency while slow clients hold connections"""
+        print('\n%d slow connections, %d workers, %d probes' % (
+            self.connections, self.workers, self.probes
+        ))
+        for name, args in self.servers:
+            port = self.start_server(args)
+            loop = asyncio.new_event_loop()
+            try:
+                latency, timeouts, served, drain = loop.run_until_complete(
+                    self.run_scenario(port)
+                )
+            finally:
+                loop.close()
+            print('%s: probe median %8.1f ms, %d probe timeouts, '
+                  '%d/%d slow clients served in %.1f s' % (
+                      name, latency, timeouts, served, self.connections, drain
+                  ))
+            if name == 'asgi':
+                self.assertLess(latency, self.probe_target_ms)
+                self.assertEqual(timeouts, 0)
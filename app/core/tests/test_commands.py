@@ -1,22 +1,246 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import Tag, Ingredient, Recipe, User, CollectionVersion
+
 
 class CommandTests(TestCase):
     def test_wait_for_db_when_ready(self):
         """Test waiting for db when ready"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
+        with patch('core.management.commands.wait_for_db.Command.ping') as p:
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+            p.assert_called_once_with('default')
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+        with patch('core.management.commands.wait_for_db.Command.ping') as p:
+            p.side_effect = [OperationalError] * 5 + [None]
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+            self.assertEqual(p.call_count, 6)
+
+        delays = [call[0][0] for call in ts.call_args_list]
+        self.assertLess(delays[0], 0.1)
+        self.assertGreater(delays[-1], delays[0])
+
+    @patch('time.sleep', return_value=True)
+    def test_wait_for_db_timeout(self, ts):
+        """Test that waiting for db gives up after the timeout"""
+        with patch('core.management.commands.wait_for_db.Command.ping') as p:
+            p.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0)
+
+    def test_wait_for_multiple_databases(self):
+        """Test waiting for several database aliases"""
+        with patch('core.management.commands.wait_for_db.Command.ping') as p:
+            call_command('wait_for_db', databases=['default', 'replica'])
+            self.assertEqual(
+                sorted(call[0][0] for call in p.call_args_list),
+                ['default', 'replica']
+            )
+
+    def test_wait_for_db_runs_query(self):
+        """Test that waiting for db runs a query on the real database"""
+        out = StringIO()
+        call_command('wait_for_db', stdout=out)
+
+        self.assertIn('Connected to Database', out.getvalue())
+
+    def test_benchmark_hashers(self):
+        """Test that the hasher benchmark reports every usable hasher"""
+        out = StringIO()
+        call_command('benchmark_hashers', rounds=1, stdout=out)
+
+        self.assertIn('pbkdf2_sha256: ', out.getvalue())
+        self.assertIn('hashes/sec per core', out.getvalue())
+
+    def test_seed_data(self):
+        """Test seeding users with their tags, ingredients and recipes"""
+        call_command('seed_data', users=2, tags=5, ingredients=10,
+                     recipes=20, stdout=StringIO())
+
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Tag.objects.count(), 10)
+        self.assertEqual(Ingredient.objects.count(), 20)
+        self.assertEqual(Recipe.objects.count(), 40)
+        self.assertFalse(Recipe.objects.filter(tags=None).exists())
+        self.assertFalse(Recipe.objects.filter(search_vector=None).exists())
+        user = User.objects.get(email_add='seed-0@example.com')
+        self.assertTrue(user.check_password('seed-password'))
+
+    def test_seed_data_reproducible(self):
+        """Test that the same seed gives the same dataset"""
+        for prefix in ('first', 'second'):
+            call_command('seed_data', users=1, tags=3, ingredients=3,
+                         recipes=5, email_prefix=prefix, stdout=StringIO())
+
+        def dataset(prefix):
+            recipes = Recipe.objects.filter(
+                user__email_add__startswith=prefix
+            ).order_by('id')
+            return [
+                (recipe.title, [tag.name for tag in recipe.tags.all()])
+                for recipe in recipes
+            ]
+
+        self.assertEqual(dataset('first'), dataset('second'))
+
+    def test_seed_data_existing_users(self):
+        """Test that seeding twice with the same prefix is refused"""
+        call_command('seed_data', users=1, recipes=0, stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('seed_data', users=1, recipes=0, stdout=StringIO())
+
+    def test_benchmark_api(self):
+        """Test that the API benchmark writes its results as JSON"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command('benchmark_api', sizes='3,6', users=1, requests=2,
+                         output=output, stdout=StringIO())
+            with open(output) as results_file:
+                results = json.load(results_file)
+
+        self.assertEqual(len(results['results']), 10)
+        self.assertEqual(
+            {result['endpoint'] for result in results['results']},
+            {'signup', 'token', 'me', 'tags', 'ingredients'}
+        )
+        self.assertGreater(results['results'][0]['p99_ms'], 0)
+        self.assertFalse(Tag.objects.exists())
+
+
+class ImportExportCommandTests(TestCase):
+
+    def setUp(self):
+        call_command('seed_data', users=2, tags=5, ingredients=10,
+                     recipes=20, stdout=StringIO())
+        self.owner = User.objects.create_user(
+            email_add='import@example.com', password='import-password'
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def dataset(self, **filters):
+        return sorted(
+            (
+                recipe.title, recipe.time_minutes, recipe.price,
+                sorted(tag.name for tag in recipe.tags.all()),
+                sorted(ing.name for ing in recipe.ingredients.all()),
+            )
+            for recipe in Recipe.objects.filter(**filters).prefetch_related(
+                'tags', 'ingredients'
+            )
+        )
+
+    def round_trip(self, name):
+        """Export the recipes of the first user and import them back"""
+        source = User.objects.get(email_add='seed-0@example.com')
+        call_command('export_recipes', self.path(name),
+                     user=source.email_add, stdout=StringIO())
+        out = StringIO()
+        call_command('import_recipes', self.path(name),
+                     user=self.owner.email_add, chunk_size=7, batch_size=3,
+                     stdout=out)
+
+        self.assertIn('Imported 20 recipes', out.getvalue())
+        self.assertEqual(self.dataset(user=self.owner),
+                         self.dataset(user=source))
+
+    def test_round_trip_ndjson(self):
+        """Test that exported NDJSON imports back to the same recipes"""
+        self.round_trip('recipes.ndjson')
+
+        self.assertFalse(Recipe.objects.filter(search_vector=None).exists())
+        self.assertEqual(
+            CollectionVersion.objects.current(self.owner.id, 'tag')[0], 3
+        )
+
+    def test_round_trip_csv(self):
+        """Test that exported CSV imports back to the same recipes"""
+        self.round_trip('recipes.csv')
+
+    def test_round_trip_csv_separator_in_names(self):
+        """Test that names holding the CSV list separator round trip"""
+        source = User.objects.get(email_add='seed-0@example.com')
+        recipe = Recipe.objects.filter(user=source).first()
+        recipe.tags.add(Tag.objects.create(user=source, name='Sweet|Sour'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=source, name='Salt \\|Pepper\\')
+        )
+
+        self.round_trip('recipes.csv')
+
+        self.assertTrue(Tag.objects.filter(
+            user=self.owner, name='Sweet|Sour'
+        ).exists())
+
+    def test_import_reuses_names(self):
+        """Test that import links the tags a user already has"""
+        tag = Tag.objects.create(user=self.owner, name='Vegan')
+        with open(self.path('recipes.ndjson'), 'w') as source:
+            for title in ('Curry', 'Stew'):
+                source.write(json.dumps({
+                    'user': self.owner.email_add, 'title': title,
+                    'time_minutes': 10, 'price': '5.00',
+                    'tags': ['Vegan', 'Quick', 'Quick'],
+                    'ingredients': ['Rice'],
+                }) + '\n')
+
+        call_command('import_recipes', self.path('recipes.ndjson'),
+                     chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(Tag.objects.filter(user=self.owner).count(), 2)
+        self.assertEqual(tag.recipe_set.count(), 2)
+        self.assertEqual(
+            Recipe.objects.get(title='Stew').tags.count(), 2
+        )
+
+    def test_import_invalid_record(self):
+        """Test that an invalid record stops the import after its chunk"""
+        lines = [
+            {'user': self.owner.email_add, 'title': 'Curry',
+             'time_minutes': 10, 'price': '5.00'},
+            {'user': self.owner.email_add, 'title': 'Stew',
+             'time_minutes': 10, 'price': '5000.00'},
+        ]
+        with open(self.path('recipes.ndjson'), 'w') as source:
+            source.writelines(json.dumps(line) + '\n' for line in lines)
+
+        with self.assertRaisesRegex(CommandError, 'Line 2: .*1 recipes'):
+            call_command('import_recipes', self.path('recipes.ndjson'),
+                         chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(Recipe.objects.filter(user=self.owner).count(), 1)
+
+    def test_import_unknown_user(self):
+        """Test that recipes of unknown users are refused"""
+        with open(self.path('recipes.csv'), 'w') as source:
+            source.write('user,title,time_minutes,price\n'
+                         'nobody@example.com,Curry,10,5.00\n')
+
+        with self.assertRaisesRegex(CommandError, 'nobody@example.com'):
+            call_command('import_recipes', self.path('recipes.csv'),
+                         stdout=StringIO())
+
+    def test_export_queries_per_chunk(self):
+        """Test that export reads the names of a whole chunk at once"""
+        # One cursor, then tag and ingredient names for each of 4 chunks
+        with self.assertNumQueries(9):
+            call_command('export_recipes', self.path('recipes.ndjson'),
+                         chunk_size=10, stdout=StringIO())
+
+        with open(self.path('recipes.ndjson')) as exported:
+            self.assertEqual(len(exported.readlines()), 40)
@@ -0,0 +1,95 @@
+from unittest.mock import patch
+
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.db import check_persistent_connections
+from core.tests.utils import benchmark, median_time
+
+
+@override_settings(DB_HEALTH_CHECK_INTERVAL=30)
+class PersistentConnectionTests(TestCase):
+
+    def setUp(self):
+        # Requests of earlier tests may have checked the connection already
+        checks = connections['default'].__dict__
+        checks.pop('health_checked_at', None)
+        self.addCleanup(checks.pop, 'health_checked_at', None)
+
+    def test_unusable_connection_closed(self):
+        """Test that a dropped persistent connection is closed on reuse"""
+        connection.ensure_connection()
+        with patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 60}), \
+                patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close') as close:
+            check_persistent_connections()
+
+        close.assert_called_once_with()
+
+    def test_usable_connection_kept(self):
+        """Test that a healthy persistent connection is reused"""
+        connection.ensure_connection()
+        with patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 60}), \
+                patch.object(connection, 'close') as close:
+            check_persistent_connections()
+
+        close.assert_not_called()
+
+    def test_checked_once_per_interval(self):
+        """Test that connections are pinged at most once per interval"""
+        connection.ensure_connection()
+        with patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 60}), \
+                patch.object(connection, 'is_usable',
+                             return_value=True) as is_usable:
+            with patch('time.monotonic', return_value=1000.0):
+                check_persistent_connections()
+                check_persistent_connections()
+            with patch('time.monotonic', return_value=1031.0):
+                check_persistent_connections()
+
+        self.assertEqual(is_usable.call_count, 2)
+
+    @override_settings(DB_HEALTH_CHECK_INTERVAL=0)
+    def test_checks_disabled(self):
+        """Test that an interval of 0 turns the checks off"""
+        connection.ensure_connection()
+        with patch.dict(connection.settings_dict, {'CONN_MAX_AGE': 60}), \
+                patch.object(connection, 'is_usable') as is_usable:
+            check_persistent_connections()
+
+        is_usable.assert_not_called()
+
+
+@benchmark
+class ConnectionReuseBenchmark(SimpleTestCase):
+    """
+    Compare the latency of a small query when every request opens its own
+    connection with the latency on a reused connection
+    """
+    requests = 200
+
+    def run_requests(self, reuse):
+        conn = connections['default'].__class__(
+            dict(connections['default'].settings_dict), 'default'
+        )
+
+        def query():
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not reuse:
+                conn.close()
+
+        try:
+            return median_time(query, self.requests)[0]
+        finally:
+            conn.close()
+
+    def test_connection_reuse_latency(self):
+        """Test that reusing connections makes small queries faster"""
+        fresh = self.run_requests(reuse=False)
+        reused = self.run_requests(reuse=True)
+        print('\nmedian latency: new connection %.2fms, reused %.2fms' % (
+            fresh * 1000, reused * 1000
+        ))
+
+        self.assertLess(reused, fresh)
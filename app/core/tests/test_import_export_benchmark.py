@@ -0,0 +1,61 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Recipe, User
+from core.tests.utils import benchmark
+
+
+@benchmark
+class ImportExportBenchmark(TestCase):
+    """
+    Report the rows per second of export_recipes and import_recipes for
+    BENCHMARK_RECIPES recipes (20k by default) in both formats, and check
+    them against their targets
+    """
+    recipes = int(os.environ.get('BENCHMARK_RECIPES', 20000))
+    export_target = float(os.environ.get('EXPORT_TARGET_ROWS_PER_SEC', 5000))
+    import_target = float(os.environ.get('IMPORT_TARGET_ROWS_PER_SEC', 1000))
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', users=1, tags=50, ingredients=200,
+                     recipes=cls.recipes, stdout=StringIO())
+        cls.owner = User.objects.create_user(
+            email_add='import@example.com', password='import-password'
+        )
+
+    def rows_per_sec(self, *args, **options):
+        start = time.perf_counter()
+        call_command(*args, stdout=StringIO(), **options)
+        return self.recipes / (time.perf_counter() - start)
+
+    def run_format(self, fmt):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'recipes.%s' % fmt)
+            exported = self.rows_per_sec(
+                'export_recipes', path, user='seed-0@example.com'
+            )
+            imported = self.rows_per_sec(
+                'import_recipes', path, user=self.owner.email_add
+            )
+        print('\n%s with %d recipes: export %.0f rows/sec, '
+              'import %.0f rows/sec' % (fmt, self.recipes, exported, imported))
+
+        self.assertEqual(
+            Recipe.objects.filter(user=self.owner).count(), self.recipes
+        )
+        self.assertGreater(exported, self.export_target)
+        self.assertGreater(imported, self.import_target)
+
+    def test_ndjson_throughput(self):
+        """Test NDJSON export and import throughput"""
+        self.run_format('ndjson')
+
+    def test_csv_throughput(self):
+        """Test CSV export and import throughput"""
+        self.run_format('csv')
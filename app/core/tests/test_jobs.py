@@ -0,0 +1,197 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+
+def record(job):
+    """Task returning its payload"""
+    return job.payload
+
+
+def fail(job):
+    """Task that always fails"""
+    raise RuntimeError('Boom')
+
+
+def refuse(job):
+    """Task that fails in a way retries cannot fix"""
+    raise jobs.PermanentError('Never')
+
+
+TEST_TASKS = {
+    'record': jobs.Task(record, 'record'),
+    'fail': jobs.Task(fail, 'fail', max_attempts=2),
+    'limited': jobs.Task(record, 'limited', concurrency=1),
+    'refuse': jobs.Task(refuse, 'refuse'),
+}
+
+
+@patch.dict(jobs.TASKS, TEST_TASKS)
+@override_settings(JOB_QUEUE={'RETRY_DELAY': 10, 'MAX_RETRY_DELAY': 15})
+class JobQueueTests(TestCase):
+
+    def test_tasks_registered(self):
+        """Test that the tasks modules of the apps are registered"""
+        self.assertIn('rebuild_search_vectors', jobs.TASKS)
+        self.assertTrue(jobs.TASKS['import_recipes'].public)
+
+    def test_run_job(self):
+        """Test that a claimed job runs and records its result"""
+        job = jobs.enqueue('record', {'answer': 42})
+
+        claimed = jobs.claim()
+        self.assertEqual(claimed, job)
+        self.assertEqual(claimed.status, Job.RUNNING)
+        jobs.run(claimed)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'answer': 42})
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(jobs.claim())
+
+    def test_claim_order(self):
+        """Test that jobs are claimed by priority, then oldest first"""
+        low = jobs.enqueue('record')
+        high = jobs.enqueue('record', priority=5)
+        later = jobs.enqueue('record', priority=5)
+        jobs.enqueue('record', priority=9, delay=60)
+
+        self.assertEqual(
+            [jobs.claim(), jobs.claim(), jobs.claim(), jobs.claim()],
+            [high, later, low, None]
+        )
+
+    def test_retry_then_fail(self):
+        """Test that failed jobs are retried later until out of attempts"""
+        job = jobs.enqueue('fail')
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.error, 'RuntimeError: Boom')
+        self.assertGreater(job.run_after, timezone.now() + timedelta(
+            seconds=9
+        ))
+        self.assertIsNone(jobs.claim())
+
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_permanent_error_not_retried(self):
+        """Test that permanent errors fail jobs with attempts left"""
+        job = jobs.enqueue('refuse')
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run(jobs.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.error, 'PermanentError: Never')
+
+    def test_retry_delay_doubles(self):
+        """Test that retry delays double up to the maximum"""
+        self.assertEqual(
+            [jobs.retry_delay(n).total_seconds() for n in (1, 2, 3)],
+            [10, 15, 15]
+        )
+
+    def test_unknown_task_fails(self):
+        """Test that jobs of unregistered tasks fail without retries"""
+        job = Job.objects.create(task='missing', max_attempts=3)
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run(jobs.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('Unknown task', job.error)
+
+    def test_concurrency_limit(self):
+        """Test that tasks at their concurrency limit are skipped"""
+        first = jobs.enqueue('limited')
+        second = jobs.enqueue('limited')
+        other = jobs.enqueue('record')
+
+        claimed = jobs.claim()
+        self.assertEqual(claimed, first)
+        self.assertEqual(jobs.claim(), other)
+        self.assertIsNone(jobs.claim())
+
+        jobs.run(claimed)
+        self.assertEqual(jobs.claim(), second)
+
+    def test_expired_lease_requeued(self):
+        """Test that jobs of lost workers are retried, then failed"""
+        job = jobs.enqueue('fail')
+        jobs.claim()
+        Job.objects.update(lease_expires_at=timezone.now())
+
+        self.assertEqual(jobs.requeue_expired(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+
+        stale = jobs.claim()
+        Job.objects.update(lease_expires_at=timezone.now())
+        jobs.requeue_expired()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.error, 'Timed out')
+
+        # The lost worker finishing late leaves the outcome alone
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run(stale)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+
+@patch.dict(jobs.TASKS, TEST_TASKS)
+class JobWorkerTests(TransactionTestCase):
+
+    def test_claim_skips_locked_jobs(self):
+        """Test that a job locked by another worker is skipped"""
+        locked = jobs.enqueue('record', priority=1)
+        free = jobs.enqueue('record')
+        other = connections['default'].__class__(
+            dict(connections['default'].settings_dict), 'default'
+        )
+        try:
+            other.set_autocommit(False)
+            with other.cursor() as cursor:
+                cursor.execute(
+                    'SELECT id FROM core_job WHERE id = %s FOR UPDATE',
+                    [locked.id]
+                )
+                self.assertEqual(jobs.claim(), free)
+        finally:
+            other.rollback()
+            other.close()
+
+    def test_run_workers_burst(self):
+        """Test that workers run every due job and exit in burst mode"""
+        for n in range(5):
+            jobs.enqueue('record', {'n': n})
+
+        out = StringIO()
+        call_command('run_workers', workers=3, burst=True, poll_interval=0,
+                     stdout=out)
+
+        self.assertEqual(
+            Job.objects.filter(status=Job.SUCCEEDED).count(), 5
+        )
+        self.assertIn('Job workers stopped', out.getvalue())
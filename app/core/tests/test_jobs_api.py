@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Job, Recipe
+
+JOBS_URL = reverse('core:job-list')
+
+
+def detail_url(job_id):
+    """Return the job detail URL"""
+    return reverse('core:job-detail', args=[job_id])
+
+
+class Public_Job_API_Test(TestCase):
+    """Test that jobs require authentication"""
+
+    def test_login_required(self):
+        res = APIClient().get(JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class Private_Job_API_Test(TestCase):
+    """Test enqueuing jobs and polling their status"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="testuser1"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def run_jobs(self):
+        """Run the due jobs the way a worker would"""
+        job = jobs.claim()
+        while job is not None:
+            jobs.run(job)
+            job = jobs.claim()
+
+    def test_enqueue_and_poll(self):
+        """Test that an import is accepted right away and run later"""
+        res = self.client.post(JOBS_URL, {
+            "task": "import_recipes",
+            "payload": {
+                "format": "csv",
+                "data": "title,time_minutes,price,tags\n"
+                        "Curry,30,5.00,Spicy|Vegan\n",
+            },
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['status'], Job.QUEUED)
+        self.assertTrue(res['Location'].endswith(detail_url(res.data['id'])))
+        self.assertFalse(Recipe.objects.exists())
+
+        self.run_jobs()
+        res = self.client.get(detail_url(res.data['id']))
+
+        self.assertEqual(res.data['status'], Job.SUCCEEDED)
+        self.assertIn('Imported 1 recipes', res.data['result']['message'])
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.tags.count(), 2)
+
+    def test_failed_job_reports_error(self):
+        """Test that a failed job shows its error and is not retried"""
+        res = self.client.post(JOBS_URL, {
+            "task": "import_recipes",
+            "payload": {"format": "ndjson", "data": "{not json\n"},
+        }, format='json')
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.run_jobs()
+        res = self.client.get(detail_url(res.data['id']))
+
+        self.assertEqual(res.data['status'], Job.FAILED)
+        self.assertIn('Invalid ndjson', res.data['error'])
+        self.assertEqual(res.data['attempts'], 1)
+
+    def test_staff_only_task(self):
+        """Test that only staff can enqueue tasks that are not public"""
+        payload = {"task": "rebuild_search_vectors", "priority": 10}
+        res = self.client.post(JOBS_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('task', res.data)
+        self.assertIn('priority', res.data)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.post(JOBS_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['priority'], 10)
+
+    def test_unknown_task(self):
+        """Test that tasks must be registered"""
+        res = self.client.post(JOBS_URL, {"task": "missing"}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_jobs_limited_to_user(self):
+        """Test that users only see their own jobs"""
+        user2 = get_user_model().objects.create_user(
+            email_add="user2@firstapp.com",
+            password="testuser2"
+        )
+        other = jobs.enqueue('import_recipes', user=user2)
+        own = jobs.enqueue('import_recipes', user=self.user)
+
+        res = self.client.get(JOBS_URL)
+        self.assertEqual(
+            [job['id'] for job in res.data['results']], [own.id]
+        )
+        res = self.client.get(detail_url(other.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
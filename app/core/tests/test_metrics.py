@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import Histogram, registry
+from core.models import Tag
+
+TAG_URL = reverse("recipe:tag-list")
+METRICS_URL = reverse("metrics")
+
+
+class HistogramTests(SimpleTestCase):
+
+    def test_percentiles(self):
+        """Test that percentiles are read back within a bucket"""
+        histogram = Histogram()
+        for value in range(1, 101):
+            histogram.record(value)
+
+        for percent in (50, 90, 99):
+            self.assertGreaterEqual(histogram.percentile(percent), percent)
+            self.assertLessEqual(histogram.percentile(percent), percent * 1.25)
+        self.assertEqual(histogram.percentile(100), 100)
+
+    def test_empty(self):
+        """Test that an empty histogram has no percentiles"""
+        self.assertIsNone(Histogram().percentile(50))
+
+
+@override_settings(
+    REQUEST_METRICS={'SAMPLE_RATE': 1},
+    LIST_RESPONSE_CACHE={'BACKEND': 'local', 'MAX_ENTRIES': 0, 'TIMEOUT': 0}
+)
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        registry.clear()
+        self.addCleanup(registry.clear)
+        self.user = get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="awesome1"
+        )
+        Tag.objects.create(user=self.user, name="Vegan")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_server_timing_header(self):
+        """Test that sampled responses report their timings"""
+        res = self.client.get(TAG_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertRegex(
+            res['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="[1-9]\d* queries", '
+            r'serializer;dur=[\d.]+, total;dur=[\d.]+$'
+        )
+
+    def test_route_recorded(self):
+        """Test that timings are aggregated per route"""
+        self.client.get(TAG_URL)
+        self.client.get(TAG_URL)
+
+        summary = registry.summary()['GET recipe:tag-list']
+        self.assertEqual(summary['count'], 2)
+        self.assertGreater(summary['latency_ms']['p50'], 0)
+        self.assertGreater(summary['serializer_ms']['p99'], 0)
+        self.assertGreater(summary['queries']['mean'], 0)
+
+    @override_settings(REQUEST_METRICS={'SAMPLE_RATE': 0})
+    def test_sampling_off(self):
+        """Test that nothing is wrapped or recorded when sampling is off"""
+        with patch.object(connection, 'execute_wrapper') as wrapper:
+            res = self.client.get(TAG_URL)
+
+        wrapper.assert_not_called()
+        self.assertNotIn('Server-Timing', res)
+        self.assertEqual(registry.summary(), {})
+
+    def test_metrics_requires_admin(self):
+        """Test that only staff can read the metrics"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_endpoint(self):
+        """Test that staff can read the per route summary"""
+        self.client.get(TAG_URL)
+        self.user.is_staff = True
+        self.user.save()
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('GET recipe:tag-list', res.data)
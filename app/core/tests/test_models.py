@@ -1,4 +1,9 @@
-from django.test import TestCase
+import threading
+import time
+from unittest import skipUnless
+
+from django.db import connection, IntegrityError, transaction
+from django.test import TestCase, TransactionTestCase
 from django.contrib.auth import get_user_model
 
 from core import models
@@ -81,3 +86,95 @@ class ModelTests(TestCase):
         )
 
         self.assertEqual(str(recipe), recipe.title)
+
+    def test_tag_name_unique_per_user(self):
+        """Test that the same user cant own two tags with the same name"""
+        user = create_sample_user()
+        models.Tag.objects.create(user=user, name="Vegan")
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name="Vegan")
+
+    def test_delete_user_with_recipes(self):
+        """
+        Test that deleting a user removes its recipes, tags and
+        collection versions without breaking foreign keys
+        """
+        user = create_sample_user()
+        tag = models.Tag.objects.create(user=user, name="Vegan")
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title="CheeseCake",
+            time_minutes=5,
+            price=345.0
+        )
+        recipe.tags.add(tag)
+
+        user.delete()
+        connection.check_constraints()
+
+        self.assertFalse(models.Tag.objects.exists())
+        self.assertFalse(models.CollectionVersion.objects.exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Needs the Postgres planner')
+class ModelIndexTests(TestCase):
+    """Test that list queries are served by the composite indexes"""
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            # Small test tables would otherwise always be scanned whole, and
+            # sorting a handful of rows can look cheaper than an index order
+            # once other tests have analyzed the tables
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_bitmapscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+            if connection.pg_version >= 130000:
+                # Nor a sort of the rows sharing a name in the unique index
+                cursor.execute('SET LOCAL enable_incremental_sort = off')
+            cursor.execute('EXPLAIN ' + sql, params)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def test_attribute_list_uses_index_without_sort(self):
+        """Test that the per-user list query needs no sort step"""
+        user = create_sample_user()
+        for model in (models.Tag, models.Ingredient):
+            for name in ("Salt", "Sugar", "Vegan"):
+                model.objects.create(user=user, name=name)
+            queryset = model.objects.filter(user=user).order_by(
+                "-name", "-id"
+            )[:101]
+
+            plan = self.explain(queryset)
+            self.assertRegex(plan, r'Index (Only )?Scan')
+            self.assertNotIn('Sort', plan)
+
+
+class CollectionVersionTests(TransactionTestCase):
+    """Test bumping collection versions from concurrent transactions"""
+
+    def test_concurrent_first_bumps(self):
+        """Test that two first changes committed together both count"""
+        user = create_sample_user()
+        bumped = threading.Event()
+
+        def bump_and_hold():
+            try:
+                with transaction.atomic():
+                    models.CollectionVersion.objects.bump(user.id, 'tag')
+                    bumped.set()
+                    # Keep the new row uncommitted while the other bump runs
+                    time.sleep(0.3)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=bump_and_hold)
+        thread.start()
+        bumped.wait(5)
+        models.CollectionVersion.objects.bump(user.id, 'tag')
+        thread.join()
+
+        self.assertEqual(
+            models.CollectionVersion.objects.current(user.id, 'tag')[0], 2
+        )
@@ -0,0 +1,87 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from core.query_budget import QueryBudget, QueryBudgetExceeded, query_shape
+from recipe.views import TagView
+
+TAG_URL = reverse("recipe:tag-list")
+
+
+class QueryShapeTests(SimpleTestCase):
+
+    def test_numbers_and_lists_normalized(self):
+        """Test that queries differing only in literals share a shape"""
+        self.assertEqual(
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s) LIMIT 21'),
+            query_shape('SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 5')
+        )
+        self.assertNotEqual(
+            query_shape('SELECT * FROM t1'), query_shape('SELECT * FROM t2')
+        )
+
+
+class QueryBudgetTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="awesome1"
+        )
+
+    def test_within_budget(self):
+        """Test that code within its budget passes"""
+        with QueryBudget(1) as budget:
+            list(Tag.objects.all())
+
+        self.assertEqual(budget.queries, 1)
+
+    def test_over_budget(self):
+        """Test that running more queries than the budget fails"""
+        with self.assertRaisesRegex(QueryBudgetExceeded, '2 queries run'):
+            with QueryBudget(1, max_repeats=None):
+                list(Tag.objects.all())
+                list(Tag.objects.all())
+
+    def test_repeated_shape_reported_with_stack(self):
+        """Test that an N+1 loop is reported with where it ran"""
+        for name in ("Vegan", "Dessert"):
+            Tag.objects.create(user=self.user, name=name)
+
+        with self.assertRaises(QueryBudgetExceeded) as error:
+            with QueryBudget():
+                for tag in Tag.objects.all():
+                    Tag.objects.get(pk=tag.pk)
+
+        message = str(error.exception)
+        self.assertIn('Query run 2 times, at most 1 allowed', message)
+        self.assertIn('test_query_budget.py', message)
+
+    def test_decorator(self):
+        """Test that the budget can decorate a function"""
+        @QueryBudget(0)
+        def query():
+            list(Tag.objects.all())
+
+        with self.assertRaises(QueryBudgetExceeded):
+            query()
+
+    @override_settings(QUERY_BUDGET={
+        'ENABLED': True, 'MAX_QUERIES': 50, 'MAX_REPEATS': 3
+    })
+    def test_middleware_logs_view_over_budget(self):
+        """Test that staging logs requests over the budget of their view"""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        with patch.object(TagView, 'query_budget', 1), \
+                self.assertLogs('core.middleware', 'WARNING') as logs:
+            res = client.get(TAG_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('2 queries run, the budget is 1', logs.output[0])
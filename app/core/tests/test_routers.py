@@ -0,0 +1,201 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, \
+                        TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import routers
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Tag
+from recipe.views import TagView
+
+TAG_URL = reverse("recipe:tag-list")
+
+SHARED_CACHES = dict(settings.CACHES, shared={
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(tempfile.gettempdir(), 'recipe-app-test-cache'),
+})
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica_0'],
+    REPLICA_ROUTING=dict(settings.REPLICA_ROUTING, PIN_CACHE='default'),
+)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.request = RequestFactory().get(TAG_URL)
+        self.addCleanup(routers.end_request)
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+
+    def test_safe_request_reads_replica(self):
+        """Test that reads of a safe request go to a replica"""
+        routers.begin_request(self.request, replica_reads=True)
+
+        self.assertEqual(self.router.db_for_read(Tag), 'replica_0')
+        self.assertEqual(self.router.db_for_write(Tag), 'default')
+
+    def test_unsafe_request_reads_primary(self):
+        """Test that reads of a write request go to the primary"""
+        routers.begin_request(self.request, replica_reads=False)
+
+        self.assertEqual(self.router.db_for_read(Tag), 'default')
+
+    def test_outside_request_reads_primary(self):
+        """Test that queries outside a request use the primary"""
+        routers.end_request()
+
+        self.assertEqual(self.router.db_for_read(Tag), 'default')
+
+    def test_primary_models(self):
+        """Test that tokens are always read from the primary"""
+        routers.begin_request(self.request, replica_reads=True)
+
+        self.assertEqual(self.router.db_for_read(Token), 'default')
+
+    def test_view_override(self):
+        """Test that a view can keep its reads on the primary"""
+        routers.begin_request(self.request, replica_reads=True)
+        routers.use_primary()
+
+        self.assertEqual(self.router.db_for_read(Tag), 'default')
+
+    def test_in_transaction_reads_primary(self):
+        """Test that reads inside a transaction on the primary stay there"""
+        routers.begin_request(self.request, replica_reads=True)
+
+        with patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(Tag), 'default')
+
+    def test_pinned_by_cookie(self):
+        """Test that a client holding the pin cookie reads the primary"""
+        self.request.COOKIES[routers.PIN_COOKIE] = '1'
+        routers.begin_request(self.request, replica_reads=True)
+
+        self.assertEqual(self.router.db_for_read(Tag), 'default')
+
+    def test_pinned_user(self):
+        """Test that a user who wrote recently reads the primary"""
+        self.request.user = get_user_model()(pk=7)
+        routers.begin_request(self.request, replica_reads=True)
+        self.assertEqual(self.router.db_for_read(Tag), 'replica_0')
+
+        response = HttpResponse()
+        routers.pin_to_primary(self.request, response)
+        routers.begin_request(self.request, replica_reads=True)
+
+        self.assertEqual(self.router.db_for_read(Tag), 'default')
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=['replica_0', 'replica_1'])
+    def test_one_replica_per_request(self):
+        """Test that all reads of a request go to the same replica"""
+        with patch('random.choice', return_value='replica_1') as choice:
+            routers.begin_request(self.request, replica_reads=True)
+            aliases = {self.router.db_for_read(Tag) for _ in range(3)}
+
+        self.assertEqual(aliases, {'replica_1'})
+        choice.assert_called_once_with(['replica_0', 'replica_1'])
+
+    def test_pin_checked_once(self):
+        """Test that the pin cache is read once per request"""
+        self.request.user = get_user_model()(pk=7)
+        routers.begin_request(self.request, replica_reads=True)
+
+        with patch.object(caches['default'], 'get',
+                          return_value=None) as get:
+            for _ in range(3):
+                self.assertEqual(self.router.db_for_read(Tag), 'replica_0')
+
+        get.assert_called_once_with(routers.pin_key(7))
+
+    def test_local_pin_cache_refused(self):
+        """Test that the app refuses to start with a local pin cache"""
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaRoutingMiddleware(lambda request: None)
+
+        with self.settings(CACHES=SHARED_CACHES, REPLICA_ROUTING=dict(
+                settings.REPLICA_ROUTING, PIN_CACHE='shared')):
+            ReplicaRoutingMiddleware(lambda request: None)
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica_0'],
+    CACHES=SHARED_CACHES,
+    REPLICA_ROUTING=dict(settings.REPLICA_ROUTING, PIN_CACHE='shared'),
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Route API requests between the primary and a mirror connection"""
+    multi_db = True
+
+    @classmethod
+    def setUpClass(cls):
+        # Without configured replicas, read through a second connection to
+        # the test database, as a mirror of the primary
+        cls.mirror = 'replica_0' not in connections.databases
+        if cls.mirror:
+            connections.databases['replica_0'] = dict(
+                connections.databases['default'], TEST={'MIRROR': 'default'}
+            )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls.mirror:
+            connections['replica_0'].close()
+            del connections['replica_0']
+            del connections.databases['replica_0']
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.addCleanup(caches['shared'].clear)
+        self.user = get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="awesome1"
+        )
+        Tag.objects.create(user=self.user, name="Vegan")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.replica = connections['replica_0']
+
+    def test_reads_your_writes(self):
+        """
+        Test that lists are read from the replica until the user writes,
+        and from the primary right after
+        """
+        with CaptureQueriesContext(self.replica) as replica_queries:
+            res = self.client.get(TAG_URL)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertTrue(replica_queries.captured_queries)
+
+        res = self.client.post(TAG_URL, {"name": "Dessert"})
+        self.assertIn(routers.PIN_COOKIE, res.cookies)
+        self.client.cookies.clear()
+
+        with CaptureQueriesContext(self.replica) as replica_queries:
+            res = self.client.get(TAG_URL)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertFalse(replica_queries.captured_queries)
+
+    def test_view_override(self):
+        """Test that views with replica_reads off read the primary"""
+        with patch.object(TagView, 'replica_reads', False, create=True), \
+                CaptureQueriesContext(self.replica) as replica_queries:
+            self.client.get(TAG_URL)
+
+        self.assertFalse(replica_queries.captured_queries)
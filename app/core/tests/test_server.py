@@ -0,0 +1,117 @@
+import os
+import runpy
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.models import Tag
+
+CONFIG_PATH = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+
+
+def load_config(**env):
+    """Evaluate the gunicorn configuration on a four core machine"""
+    with patch.dict(os.environ, env), \
+            patch('multiprocessing.cpu_count', return_value=4):
+        return runpy.run_path(CONFIG_PATH)
+
+
+class GunicornConfigTests(SimpleTestCase):
+
+    def test_wsgi_workers_from_cores(self):
+        """Test that WSGI workers and threads follow the core count"""
+        config = load_config()
+
+        self.assertEqual(config['wsgi_app'], 'app.wsgi:application')
+        self.assertEqual(config['worker_class'], 'gthread')
+        self.assertEqual(config['workers'], 9)
+        self.assertTrue(config['preload_app'])
+        self.assertGreater(config['max_requests'], 0)
+
+    def test_asgi_workers(self):
+        """Test that the ASGI entry point runs one uvicorn worker per core"""
+        config = load_config(GUNICORN_APP='app.asgi:application')
+
+        self.assertEqual(config['worker_class'],
+                         'uvicorn.workers.UvicornWorker')
+        self.assertEqual(config['workers'], 4)
+
+    def test_worker_count_override(self):
+        """Test that WEB_CONCURRENCY overrides the worker count"""
+        self.assertEqual(load_config(WEB_CONCURRENCY='3')['workers'], 3)
+
+
+class GunicornSmokeTest(TransactionTestCase):
+    """Drive requests through the production entry point"""
+    requests = 200
+    clients = 10
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email_add="smoke@firstapp.com",
+            password="smoketest"
+        )
+        Tag.objects.create(user=user, name="Vegan")
+        self.token = Token.objects.create(user=user).key
+
+    def start_server(self):
+        """Start gunicorn with its configuration file on a free port"""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        env = dict(
+            os.environ,
+            DB_NAME=connection.settings_dict['NAME'],
+            PORT=str(port),
+            WEB_CONCURRENCY='2',
+            GUNICORN_MAX_REQUESTS='50',
+            GUNICORN_MAX_REQUESTS_JITTER='0'
+        )
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn'], cwd=settings.BASE_DIR,
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            universal_newlines=True
+        )
+        self.addCleanup(server.stderr.close)
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port)).close()
+                return server, port
+            except OSError:
+                time.sleep(0.1)
+        server.kill()
+        self.fail('Server did not start')
+
+    def test_load(self):
+        """Test that every request succeeds while workers are recycled"""
+        server, port = self.start_server()
+        request = Request(
+            'http://127.0.0.1:%d%s' % (port, reverse('recipe:tag-list')),
+            headers={'Authorization': 'Token %s' % self.token}
+        )
+
+        def fetch(_):
+            with urlopen(request, timeout=10) as res:
+                return res.status
+
+        try:
+            with ThreadPoolExecutor(self.clients) as pool:
+                statuses = list(pool.map(fetch, range(self.requests)))
+        finally:
+            server.terminate()
+            log = server.communicate(timeout=30)[1]
+
+        self.assertEqual(statuses, [200] * self.requests)
+        self.assertEqual(server.returncode, 0)
+        self.assertIn('Autorestarting worker', log)
@@ -0,0 +1,27 @@
+import os
+import time
+from unittest import skipUnless
+
+# Benchmarks seed large datasets, so they only run when asked for
+benchmark = skipUnless(
+    os.environ.get('RUN_BENCHMARKS'), 'Set RUN_BENCHMARKS to run'
+)
+
+
+def median(values):
+    """Return the median of the values, the upper one for an even count"""
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def median_time(func, runs):
+    """
+    Call func runs times and return the median seconds per call with the
+    result of the last call
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return median(timings), result
@@ -0,0 +1,55 @@
+from rest_framework import mixins, status, viewsets
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
+
+from core.metrics import registry
+from core.models import Job
+from core.serializers import JobSerializer
+from recipe.pagination import KeysetPagination
+from user.authentication import CachedTokenAuthentication
+
+
+class RequestMetricsView(APIView):
+    """View to show latency percentiles and query counts per route"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(registry.summary())
+
+
+class JobPagination(KeysetPagination):
+    """Keyset pagination for jobs, newest first"""
+    ordering = ('-id',)
+
+
+class JobViewSet(viewsets.GenericViewSet,
+                 mixins.ListModelMixin,
+                 mixins.RetrieveModelMixin,
+                 mixins.CreateModelMixin):
+    """
+    View to enqueue background jobs and poll their status. Jobs are
+    accepted right away and run later by the workers of run_workers.
+    """
+    serializer_class = JobSerializer
+    queryset = Job.objects.all()
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    pagination_class = JobPagination
+    # Polls must see the status the workers wrote, not a lagging replica
+    replica_reads = False
+
+    def get_queryset(self):
+        """Return the jobs of the authenticated user"""
+        return self.queryset.filter(user=self.request.user).order_by('-id')
+
+    def create(self, request, *args, **kwargs):
+        """Queue a job and point to where its status can be polled"""
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        response['Location'] = reverse(
+            'core:job-detail', args=[response.data['id']], request=request
+        )
+        return response
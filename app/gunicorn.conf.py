@@ -0,0 +1,44 @@
+"""
+Gunicorn configuration for production.
+
+Start with ``gunicorn`` from this directory. Every setting can be changed
+through the environment; GUNICORN_APP=app.asgi:application serves the ASGI
+entry point with uvicorn workers instead of the WSGI one.
+"""
+
+import multiprocessing
+import os
+
+cores = multiprocessing.cpu_count()
+
+wsgi_app = os.environ.get('GUNICORN_APP', 'app.wsgi:application')
+bind = '0.0.0.0:%s' % os.environ.get('PORT', 8000)
+
+if wsgi_app.startswith('app.asgi'):
+    # Threads are set by ASGI_THREADS, one event loop per worker is enough
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.environ.get('WEB_CONCURRENCY', cores))
+else:
+    worker_class = 'gthread'
+    workers = int(os.environ.get('WEB_CONCURRENCY', cores * 2 + 1))
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import the project once in the master so workers share it copy on write
+preload_app = True
+
+# Recycle workers to cap memory growth, staggered so they do not all
+# restart at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+accesslog = '-'
+
+
+def pre_fork(server, worker):
+    """Keep workers from inheriting a database connection of the master"""
+    from django.db import connections
+    connections.close_all()
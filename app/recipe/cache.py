@@ -0,0 +1,65 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from core.cache import LRUCache
+
+
+class ListResponseCache:
+    """
+    Cache of rendered list response bodies.
+
+    Keys include the collection version of the user, so every write to the
+    collection makes the old entries unreachable; they then age out of the
+    backend. The backend is either an in-process LRU or a Django cache
+    shared by all workers. Hit and miss counters are kept per process.
+    """
+
+    def __init__(self, backend, timeout):
+        self.backend = backend
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached (content, content type) pair for key, if any"""
+        entry = self.backend.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key, content, content_type):
+        self.backend.set(key, (content, content_type), self.timeout)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+_list_cache = None
+
+
+def get_list_cache():
+    """Return the list response cache configured in the settings"""
+    global _list_cache
+    if _list_cache is None:
+        config = settings.LIST_RESPONSE_CACHE
+        if config['BACKEND'] == 'local':
+            backend = LRUCache(config['MAX_ENTRIES'])
+        else:
+            backend = caches[config['BACKEND']]
+        _list_cache = ListResponseCache(backend, config['TIMEOUT'])
+    return _list_cache
+
+
+@receiver(setting_changed)
+def reset_list_cache(setting, **kwargs):
+    global _list_cache
+    if setting == 'LIST_RESPONSE_CACHE':
+        _list_cache = None
@@ -0,0 +1,130 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate by seeking past the last row of the previous page instead of
+    using OFFSET, so every page is the same index range scan.
+    The ordering must be unique, hence the trailing primary key.
+    """
+    ordering = ('-name', '-id')
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            # Filtering converts the cursor values to the field types, which
+            # is where values of the wrong type are caught
+            try:
+                queryset = queryset.filter(self.get_seek_filter(position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Fetch one extra row to find out whether there is a next page
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_seek_filter(self, position):
+        """
+        Build the filter selecting rows strictly after the given position.
+        The leading column is also bounded on its own so the database can
+        turn the seek into an index range condition.
+        """
+        fields = [(f.lstrip('-'), f.startswith('-')) for f in self.ordering]
+        seek = Q()
+        for index, (field, descending) in enumerate(fields):
+            lookup = '%s__%s' % (field, 'lt' if descending else 'gt')
+            clause = Q(**{lookup: position[index]})
+            for prev_index, (prev_field, _) in enumerate(fields[:index]):
+                clause &= Q(**{prev_field: position[prev_index]})
+            seek |= clause
+
+        leading, descending = fields[0]
+        lookup = '%s__%s' % (leading, 'lte' if descending else 'gte')
+        return Q(**{lookup: position[0]}) & seek
+
+    def get_position_from_instance(self, instance):
+        """Return the ordering values of a row from the current page"""
+        position = []
+        for field in self.ordering:
+            field = field.lstrip('-')
+            if isinstance(instance, dict):
+                position.append(instance[field])
+            else:
+                position.append(getattr(instance, field))
+        return position
+
+    def decode_cursor(self, request):
+        """Return the position encoded in the request cursor, if any"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            position = json.loads(b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        """Return the link to the page starting after the given position"""
+        encoded = b64encode(json.dumps(position).encode('utf-8'))
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, encoded.decode('ascii')
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(
+            self.get_position_from_instance(self.page[-1])
+        )
+
+
+class RecipePagination(KeysetPagination):
+    """Keyset pagination for recipes, newest first"""
+    ordering = ('-id',)
+
+
+class RecipeSearchPagination(KeysetPagination):
+    """Keyset pagination for recipe search results, best match first"""
+    ordering = ('-rank', '-id')
@@ -1,19 +1,284 @@
+from collections import OrderedDict
+
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Value
+from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from core.metrics import TimedSerializerMixin
+from core.models import Tag, Ingredient, Recipe, CollectionVersion
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    List serializer that checks every name of a batch with one query and
+    inserts the whole batch with bulk_create
+    """
+    max_items = 5000
+    batch_size = 1000
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and len(data) > self.max_items:
+            msg = _('Ensure this list has at most %d items') % self.max_items
+            raise serializers.ValidationError(msg, code='max_length')
+
+        attrs_list = super().to_internal_value(data)
+        names = [attrs['name'] for attrs in attrs_list]
+        existing = set(self.child.Meta.model.objects.filter(
+            user=self.context['request'].user,
+            name__in=names
+        ).values_list('name', flat=True))
+
+        errors = []
+        seen = set()
+        for name in names:
+            if name in existing:
+                errors.append({'name': [
+                    _('An item with this name already exists')
+                ]})
+            elif name in seen:
+                errors.append({'name': [
+                    _('This name is repeated within the request')
+                ]})
+            else:
+                errors.append({})
+            seen.add(name)
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs_list
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        try:
+            objects = model.objects.bulk_create(
+                [model(**attrs) for attrs in validated_data],
+                batch_size=self.batch_size
+            )
+        except IntegrityError:
+            # Another request created one of the names since validation
+            msg = _('An item with one of these names already exists')
+            raise serializers.ValidationError(msg, code='unique')
+
+        # bulk_create sends no post_save signals
+        for user_id in {obj.user_id for obj in objects}:
+            CollectionVersion.objects.bump(user_id, model._meta.model_name)
+        return objects
+
 
-from core.models import Tag, Ingredient
+class RecipeAttributeSerializer(TimedSerializerMixin,
+                                serializers.ModelSerializer):
+    """Base serializer for attributes whose names are unique per user"""
 
+    def validate_name(self, value):
+        """Reject a name the requesting user already owns"""
+        if isinstance(self.parent, BulkCreateListSerializer):
+            # Checked for the whole batch at once by the list serializer
+            return value
 
-class TagSerializer(serializers.ModelSerializer):
+        queryset = self.Meta.model.objects.filter(
+            user=self.context['request'].user,
+            name=value
+        )
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            msg = _('An item with this name already exists')
+            raise serializers.ValidationError(msg, code='unique')
+        return value
+
+
+class TagSerializer(RecipeAttributeSerializer):
     """Serializer for the tag object"""
     class Meta:
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkCreateListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(RecipeAttributeSerializer):
     """Serializer for the ingredient object"""
     class Meta:
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkCreateListSerializer
+
+
+class RowSerializer(serializers.BaseSerializer):
+    """
+    Read only serializer for rows fetched with values_list(*row_fields),
+    which builds the output without model instances or field objects
+    """
+    row_fields = ()
+
+    def to_representation(self, row):
+        return OrderedDict(zip(self.row_fields, row))
+
+
+class RecipeAttributeRowSerializer(TimedSerializerMixin, RowSerializer):
+    """Row serializer with the same output as the attribute serializers"""
+    row_fields = ('id', 'name')
+
+
+class UserOwnedManyRelatedField(serializers.ManyRelatedField):
+    """Many related field that looks up all of its ids with one query"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        pks = []
+        for pk in data:
+            if isinstance(pk, bool):
+                child.fail('incorrect_type', data_type=type(pk).__name__)
+            try:
+                pks.append(int(pk))
+            except (TypeError, ValueError):
+                child.fail('incorrect_type', data_type=type(pk).__name__)
+
+        objects = child.get_queryset().in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=pk)
+        return [objects[pk] for pk in dict.fromkeys(pks)]
+
+
+class UserOwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field that only accepts objects of the requesting user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {
+            key: value for key, value in kwargs.items()
+            if key in MANY_RELATION_KWARGS
+        }
+        return UserOwnedManyRelatedField(
+            child_relation=cls(*args, **kwargs), **list_kwargs
+        )
+
+    def get_queryset(self):
+        return super().get_queryset().filter(
+            user=self.context['request'].user
+        )
+
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for creating and updating a recipe"""
+    tags = UserOwnedPrimaryKeyRelatedField(
+        many=True,
+        queryset=Tag.objects.all()
+    )
+    ingredients = UserOwnedPrimaryKeyRelatedField(
+        many=True,
+        queryset=Ingredient.objects.all()
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'title', 'tags', 'ingredients', 'time_minutes',
+                  'price', 'link')
+        read_only_fields = ('id',)
+
+
+class RecipeDetailSerializer(RecipeSerializer):
+    """Serializer for reading a recipe with its tags and ingredients"""
+    tags = TagSerializer(many=True, read_only=True)
+    ingredients = IngredientSerializer(many=True, read_only=True)
+
+
+class RecipeLinksSerializer(serializers.Serializer):
+    """
+    Serializer for adding, removing or replacing the tags and ingredients
+    of many recipes at once. Every id is checked against the requesting
+    user in one query and the links change with one statement per relation
+    and operation.
+    """
+    max_items = 1000
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(), min_length=1, max_length=max_items
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(), required=False,
+        max_length=max_items
+    )
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(), required=False,
+        max_length=max_items
+    )
+
+    models = (('recipes', Recipe), ('tags', Tag), ('ingredients', Ingredient))
+    relations = ('tags', 'ingredients')
+
+    def validate(self, attrs):
+        if not any(relation in attrs for relation in self.relations):
+            raise serializers.ValidationError(
+                _('Provide the tags or the ingredients to change')
+            )
+
+        user = self.context['request'].user
+        querysets = [
+            model.objects.filter(user=user, pk__in=attrs[name]).annotate(
+                field=Value(name, output_field=CharField())
+            ).values_list('pk', 'field')
+            for name, model in self.models if name in attrs
+        ]
+        found = set(querysets[0].union(*querysets[1:], all=True))
+
+        errors = {}
+        for name, _model in self.models:
+            missing = sorted({
+                pk for pk in attrs.get(name, ()) if (pk, name) not in found
+            })
+            if missing:
+                errors[name] = [_('Invalid ids: %s') % ', '.join(
+                    str(pk) for pk in missing
+                )]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def create(self, validated_data):
+        """
+        Apply the change given by mode, one of add, remove or replace, and
+        return how many links were added and removed for each relation
+        """
+        mode = validated_data['mode']
+        recipe_ids = list(dict.fromkeys(validated_data['recipes']))
+        result = {}
+        with transaction.atomic():
+            changed = set()
+            for relation in self.relations:
+                if relation not in validated_data:
+                    continue
+                target_ids = list(dict.fromkeys(validated_data[relation]))
+                removed = added = []
+                if mode in ('remove', 'replace'):
+                    removed = Recipe.objects.remove_links(
+                        relation, recipe_ids, target_ids,
+                        keep=mode == 'replace'
+                    )
+                if mode in ('add', 'replace'):
+                    added = Recipe.objects.add_links(
+                        relation, recipe_ids, target_ids
+                    )
+                result[relation] = {
+                    'added': len(added), 'removed': len(removed)
+                }
+                if added or removed:
+                    changed.update(added, removed)
+                    # Raw statements send no m2m_changed signals
+                    model = Recipe._meta.get_field(relation).related_model
+                    CollectionVersion.objects.bump(
+                        self.context['request'].user.id,
+                        model._meta.model_name
+                    )
+            if changed:
+                Recipe.objects.update_search_vector(changed)
+        return result
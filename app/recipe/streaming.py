@@ -0,0 +1,52 @@
+import json
+from itertools import islice
+
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class StreamingListMixin:
+    """
+    Lets a list endpoint return its whole collection as one JSON array when
+    called with ?stream=1. Rows are read through a server side cursor and
+    serialized a chunk at a time, so memory stays flat whatever the size of
+    the collection.
+    """
+    stream_query_param = 'stream'
+    stream_chunk_size = 500
+
+    def stream_requested(self):
+        value = self.request.query_params.get(self.stream_query_param)
+        return value in ('1', 'true')
+
+    def stream_list(self, queryset):
+        """Return a streaming response with every row of the queryset"""
+        return StreamingHttpResponse(
+            self.iter_json(queryset),
+            content_type='application/json'
+        )
+
+    def iter_json(self, queryset):
+        # iterator() skips prefetch_related, so prefetch each chunk instead
+        lookups = queryset._prefetch_related_lookups
+        rows = queryset.prefetch_related(None).iterator(
+            chunk_size=self.stream_chunk_size
+        )
+        # One serializer for every chunk, its fields are only bound once
+        serializer = self.get_serializer_class()(
+            many=True, context=self.get_serializer_context()
+        )
+
+        yield '['
+        separator = ''
+        while True:
+            chunk = list(islice(rows, self.stream_chunk_size))
+            if not chunk:
+                break
+            if lookups:
+                prefetch_related_objects(chunk, *lookups)
+            for item in serializer.to_representation(chunk):
+                yield separator + json.dumps(item, cls=JSONEncoder)
+                separator = ','
+        yield ']'
@@ -0,0 +1,56 @@
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
+
+from core.jobs import task
+from core.models import Recipe
+from core.recipe_io import FORMATS
+
+
+@task(concurrency=1, timeout=3600)
+def rebuild_search_vectors(job):
+    """
+    Rebuild the search vectors of the recipes listed in recipe_ids, or of
+    every recipe, committing a chunk of recipes at a time
+    """
+    chunk_size = job.payload.get('chunk_size', 5000)
+    queryset = Recipe.objects.order_by('id').values_list('id', flat=True)
+    if job.payload.get('recipe_ids') is not None:
+        queryset = queryset.filter(id__in=job.payload['recipe_ids'])
+
+    rebuilt = 0
+    last_id = 0
+    while True:
+        recipe_ids = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not recipe_ids:
+            break
+        with transaction.atomic():
+            Recipe.objects.update_search_vector(recipe_ids)
+        rebuilt += len(recipe_ids)
+        last_id = recipe_ids[-1]
+    return {'recipes': rebuilt}
+
+
+# Chunks committed before a failure stay, so a retry would import them twice
+@task(max_attempts=1, concurrency=2, timeout=3600, public=True)
+def import_recipes(job):
+    """Import the recipes in data, NDJSON or CSV by format, for the user"""
+    fmt = job.payload.get('format', 'ndjson')
+    data = job.payload.get('data')
+    if fmt not in FORMATS:
+        raise ValueError('format must be one of %s' % ', '.join(FORMATS))
+    if not isinstance(data, str):
+        raise ValueError('data must be the text of the records')
+    if job.user is None:
+        raise ValueError('The job has no user to import for')
+
+    out = StringIO()
+    with tempfile.NamedTemporaryFile('w', suffix='.' + fmt,
+                                     newline='') as source:
+        source.write(data)
+        source.flush()
+        call_command('import_recipes', source.name, format=fmt,
+                     user=job.user.email_add, stdout=out)
+    return {'message': out.getvalue().strip()}
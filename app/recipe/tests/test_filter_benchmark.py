@@ -0,0 +1,109 @@
+import os
+from unittest import skipUnless
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from core.tests.utils import benchmark, median_time
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAG_URL = reverse("recipe:tag-list")
+
+
+@benchmark
+@skipUnless(connection.vendor == 'postgresql', 'Seeds with generate_series')
+@override_settings(LIST_RESPONSE_CACHE={
+    'BACKEND': 'local', 'MAX_ENTRIES': 0, 'TIMEOUT': 0
+})
+class Recipe_Filter_Benchmark(TestCase):
+    """
+    Check the latency of the tag and ingredient filters against their
+    target for one user owning BENCHMARK_RECIPES recipes (1M by default),
+    each with 2 tags and 3 ingredients
+    """
+    recipes = int(os.environ.get('BENCHMARK_RECIPES', 1000000))
+    target_ms = float(os.environ.get('FILTER_TARGET_MS', 1000))
+    runs = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email_add="bench@firstapp.com",
+            password="benchmark"
+        )
+        Tag.objects.bulk_create([
+            Tag(user=cls.user, name="Tag %d" % i) for i in range(100)
+        ])
+        Ingredient.objects.bulk_create([
+            Ingredient(user=cls.user, name="Ingredient %d" % i)
+            for i in range(500)
+        ])
+        # An unused tag so assigned_only has something to leave out
+        Tag.objects.create(user=cls.user, name="Unused")
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO core_recipe "
+                "(title, user_id, time_minutes, price, link) "
+                "SELECT 'Recipe ' || i, %s, 10, 5, '' "
+                "FROM generate_series(1, %s) AS i",
+                [cls.user.id, cls.recipes]
+            )
+            for table, fk, model, per_recipe in (
+                    ('core_recipe_tags', 'tag_id', 'core_tag', 2),
+                    ('core_recipe_ingredients', 'ingredient_id',
+                     'core_ingredient', 3)):
+                cursor.execute(
+                    "WITH attrs AS ("
+                    "  SELECT id, row_number() OVER (ORDER BY id) - 1 AS n,"
+                    "  count(*) OVER () AS total"
+                    "  FROM {model} WHERE user_id = %s AND name <> 'Unused'"
+                    ") "
+                    "INSERT INTO {table} (recipe_id, {fk}) "
+                    "SELECT r.id, a.id FROM core_recipe r "
+                    "CROSS JOIN generate_series(0, %s) AS k "
+                    "JOIN attrs a ON a.n = (r.id * 7 + k * 13) %% a.total "
+                    "WHERE r.user_id = %s".format(
+                        model=model, table=table, fk=fk
+                    ),
+                    [cls.user.id, per_recipe - 1, cls.user.id]
+                )
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_filter_latency(self):
+        """Test that each kind of filter meets the latency target"""
+        tags = Tag.objects.filter(user=self.user).order_by('id')[:2]
+        tag_ids = ','.join(str(tag.id) for tag in tags)
+        cases = (
+            ('tags any', RECIPES_URL, {'tags': tag_ids}),
+            ('tags all', RECIPES_URL, {'tags': tag_ids, 'match': 'all'}),
+            ('tags any + ingredient', RECIPES_URL, {
+                'tags': tag_ids,
+                'ingredients': Ingredient.objects.filter(
+                    user=self.user
+                ).order_by('id')[0].id
+            }),
+            ('assigned_only tags', TAG_URL, {'assigned_only': 1}),
+        )
+
+        print('\n%d recipes, median of %d runs' % (self.recipes, self.runs))
+        latencies = {}
+        for name, url, params in cases:
+            seconds, res = median_time(
+                lambda: self.client.get(url, params), self.runs
+            )
+            latencies[name] = seconds * 1000
+            print('%-24s %8.1f ms' % (name, latencies[name]))
+            self.assertEqual(res.status_code, 200)
+
+        for name, latency in latencies.items():
+            self.assertLess(latency, self.target_ms, name)
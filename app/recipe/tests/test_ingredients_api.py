@@ -1,3 +1,6 @@
+import json
+from base64 import b64encode
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -5,7 +8,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
-from core.models import Ingredient
+from core.models import Ingredient, Recipe
+from core.query_budget import QueryBudget
 from recipe.serializers import IngredientSerializer
 
 INGREDIENTS_URL = reverse("recipe:ingredient-list")
@@ -21,7 +25,8 @@ class Public_Ingredients_API_test(TestCase):
         Test that the list of ingredients
         cant be accessed without authentication
         """
-        res = self.client.get(INGREDIENTS_URL)
+        with QueryBudget(0):
+            res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
@@ -48,12 +53,13 @@ class Private_Ingredients_API_Test(TestCase):
             user=self.user,
             name="Salt"
         )
-        res = self.client.get(INGREDIENTS_URL)
+        with QueryBudget(2):
+            res = self.client.get(INGREDIENTS_URL)
         ingredients_model = Ingredient.objects.all().order_by("-name")
         serializer = IngredientSerializer(ingredients_model, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_ingredients_user_authenticated(self):
         """
@@ -75,18 +81,21 @@ class Private_Ingredients_API_Test(TestCase):
             user=user2,
             name="Sugar"
         )
-        res = self.client.get(INGREDIENTS_URL)
+        with QueryBudget(2):
+            res = self.client.get(INGREDIENTS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
-        self.assertEqual(res.data[0]['name'], ingredient1.name)
-        self.assertEqual(res.data[1]['name'], ingredient2.name)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertEqual(res.data['results'][0]['name'], ingredient1.name)
+        self.assertEqual(res.data['results'][1]['name'], ingredient2.name)
 
     def test_create_ingredient_success(self):
         """Test if the ingredient is created successfully by the API"""
         payload = {
             "name": "Raddish"
         }
-        res = self.client.post(INGREDIENTS_URL, payload)
+        # The first write also creates the collection version row
+        with QueryBudget(7):
+            res = self.client.post(INGREDIENTS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         exists = Ingredient.objects.filter(
@@ -100,5 +109,154 @@ class Private_Ingredients_API_Test(TestCase):
         payload = {
             "name": ""
         }
-        res = self.client.post(INGREDIENTS_URL, payload)
+        with QueryBudget(0):
+            res = self.client.post(INGREDIENTS_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_ingredients_paginated(self):
+        """Test that ingredients are returned one keyset page at a time"""
+        for name in ("Carrot", "Milk", "Salt", "Sugar", "Tomato"):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        with QueryBudget(2):
+            res = self.client.get(INGREDIENTS_URL, {"page_size": 2})
+        names = [item['name'] for item in res.data['results']]
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(names, ["Tomato", "Sugar"])
+
+        res = self.client.get(res.data['next'])
+        names = [item['name'] for item in res.data['results']]
+        self.assertEqual(names, ["Salt", "Milk"])
+
+        res = self.client.get(res.data['next'])
+        names = [item['name'] for item in res.data['results']]
+        self.assertEqual(names, ["Carrot"])
+        self.assertIsNone(res.data['next'])
+
+    def test_retrieve_ingredients_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        with QueryBudget(1):
+            res = self.client.get(INGREDIENTS_URL, {"cursor": "not-a-cursor"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_ingredients_wrong_typed_cursor(self):
+        """Test that a cursor with values of the wrong type is rejected"""
+        for position in (["x", "abc"], ["x", None], ["x", [1]]):
+            cursor = b64encode(json.dumps(position).encode()).decode()
+            with QueryBudget(1):
+                res = self.client.get(INGREDIENTS_URL, {"cursor": cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_duplicate_ingredient_fail(self):
+        """Test that a user cant create two ingredients with the same name"""
+        Ingredient.objects.create(user=self.user, name="Salt")
+        with QueryBudget(1):
+            res = self.client.post(INGREDIENTS_URL, {"name": "Salt"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_ingredient_name_used_by_other_user(self):
+        """Test that names only have to be unique for a single user"""
+        user2 = get_user_model().objects.create_user(
+            email_add="user2@firstapp.com",
+            password="testuser2"
+        )
+        Ingredient.objects.create(user=user2, name="Salt")
+        res = self.client.post(INGREDIENTS_URL, {"name": "Salt"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_create_ingredients(self):
+        """Test that a list of ingredients is created in one request"""
+        payload = [{"name": "Salt"}, {"name": "Pepper"}]
+        # The first write also creates the collection version row
+        with QueryBudget(7):
+            res = self.client.post(INGREDIENTS_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 2
+        )
+
+    def test_bulk_create_duplicates_reported_per_item(self):
+        """
+        Test that duplicates within the batch or against existing
+        ingredients fail the whole batch with an error per item
+        """
+        Ingredient.objects.create(user=self.user, name="Salt")
+        payload = [
+            {"name": "Salt"},
+            {"name": "Pepper"},
+            {"name": "Pepper"},
+            {"name": ""},
+        ]
+        res = self.client.post(INGREDIENTS_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data[3])
+        self.assertEqual(Ingredient.objects.count(), 1)
+
+        res = self.client.post(INGREDIENTS_URL, payload[:3], format="json")
+
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data[0])
+        self.assertEqual(res.data[1], {})
+        self.assertIn('name', res.data[2])
+        self.assertEqual(Ingredient.objects.count(), 1)
+
+    def test_list_not_modified_since(self):
+        """Test that the list answers If-Modified-Since with 304"""
+        Ingredient.objects.create(user=self.user, name="Salt")
+        res = self.client.get(INGREDIENTS_URL)
+
+        res = self.client.get(
+            INGREDIENTS_URL,
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_bulk_create_changes_etag(self):
+        """Test that a bulk create invalidates the list ETag"""
+        etag = self.client.get(INGREDIENTS_URL)['ETag']
+        self.client.post(INGREDIENTS_URL, [{"name": "Salt"}], format="json")
+
+        res = self.client.get(INGREDIENTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_ingredients_assigned_only(self):
+        """Test filtering ingredients by those assigned to recipes"""
+        ingredient1 = Ingredient.objects.create(user=self.user, name="Apple")
+        Ingredient.objects.create(user=self.user, name="Turkey")
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title="Apple crumble",
+            time_minutes=5,
+            price=10.00
+        )
+        recipe.ingredients.add(ingredient1)
+
+        with QueryBudget(2):
+            res = self.client.get(INGREDIENTS_URL, {"assigned_only": "true"})
+        names = [item['name'] for item in res.data['results']]
+
+        self.assertEqual(names, [ingredient1.name])
+
+    def test_autocomplete_ingredients(self):
+        """Test prefix and typo tolerant ingredient search"""
+        for name in ("Cinnamon", "Cinnamon sticks", "Coriander", "Onion"):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        with QueryBudget(2):
+            res = self.client.get(INGREDIENTS_URL, {"q": "cinn"})
+        names = [item['name'] for item in res.data['results']]
+
+        self.assertEqual(names, ["Cinnamon sticks", "Cinnamon"])
+
+        res = self.client.get(INGREDIENTS_URL, {"q": "Corriander"})
+        names = [item['name'] for item in res.data['results']]
+
+        self.assertEqual(names, ["Coriander"])
@@ -0,0 +1,106 @@
+import json
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Tag, Ingredient
+from recipe.cache import get_list_cache
+
+TAG_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+CACHE_STATS_URL = reverse("recipe:cache-stats")
+
+SHARED_CACHES = dict(settings.CACHES, lists={
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'lists',
+})
+
+
+class List_Response_Cache_Test(TestCase):
+    """Test the response cache of the recipe attribute lists"""
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="awesome1"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_served_from_cache(self):
+        """Test that an unchanged list is served without the list query"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        res = self.client.get(TAG_URL)
+        hits = get_list_cache().hits
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(TAG_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.content, res.content)
+        self.assertEqual(cached['ETag'], res['ETag'])
+        self.assertEqual(get_list_cache().hits, hits + 1)
+
+    def test_write_invalidates_cached_list(self):
+        """Test that creating an ingredient invalidates the cached list"""
+        self.client.get(INGREDIENTS_URL)
+        self.client.post(INGREDIENTS_URL, {"name": "Salt"})
+
+        res = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(len(json.loads(res.content)['results']), 1)
+
+    def test_delete_invalidates_cached_list(self):
+        """Test that deleting a tag invalidates the cached list"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.client.get(TAG_URL)
+        tag.delete()
+
+        res = self.client.get(TAG_URL)
+
+        self.assertEqual(json.loads(res.content)['results'], [])
+
+    def test_lists_cached_per_user(self):
+        """Test that users never see each other's cached lists"""
+        Ingredient.objects.create(user=self.user, name="Salt")
+        self.client.get(INGREDIENTS_URL)
+        user2 = get_user_model().objects.create_user(
+            email_add="user2@firstapp.com",
+            password="testuser2"
+        )
+        self.client.force_authenticate(user=user2)
+
+        res = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(json.loads(res.content)['results'], [])
+
+    @override_settings(
+        CACHES=SHARED_CACHES,
+        LIST_RESPONSE_CACHE={'BACKEND': 'lists', 'TIMEOUT': 60}
+    )
+    def test_shared_backend(self):
+        """Test that lists can be cached in a shared cache backend"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        res = self.client.get(TAG_URL)
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(TAG_URL)
+
+        self.assertEqual(cached.content, res.content)
+        self.assertEqual(get_list_cache().stats(), {'hits': 1, 'misses': 1})
+
+    def test_cache_stats_requires_admin(self):
+        """Test that only staff can read the cache counters"""
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('hits', res.data)
@@ -0,0 +1,326 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import RecipeDetailSerializer
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def detail_url(recipe_id):
+    """Return the recipe detail URL"""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        "title": "Sample recipe",
+        "time_minutes": 10,
+        "price": 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class Public_Recipe_API_Test(TestCase):
+    """Test publically available recipe api"""
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_retrieve_recipes_unauthorized(self):
+        """Test that recipes cant be accessed without authentication"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class Private_Recipe_API_Test(TestCase):
+    """Test for Recipe API endpoints that require authentication"""
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="awesome1"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_retrieve_recipes(self):
+        """Test that recipes are listed with nested tags and ingredients"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Salt")
+        )
+        sample_recipe(user=self.user, title="Second recipe")
+
+        res = self.client.get(RECIPES_URL)
+        recipes = Recipe.objects.all().order_by("-id")
+        serializer = RecipeDetailSerializer(recipes, many=True)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], serializer.data)
+        self.assertEqual(res.data['results'][1]['tags'][0]['name'], "Vegan")
+
+    def test_recipes_limited_to_user(self):
+        """Test that only the recipes of the logged in user are returned"""
+        user2 = get_user_model().objects.create_user(
+            email_add="user2@firstapp.com",
+            password="testuser2"
+        )
+        sample_recipe(user=user2)
+        sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_query_count_constant(self):
+        """
+        Test that listing recipes takes the same number of queries
+        for a page of 1 recipe and a page of 500 recipes
+        """
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        ingredient = Ingredient.objects.create(user=self.user, name="Salt")
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title="Recipe %d" % i,
+                   time_minutes=10, price=5)
+            for i in range(500)
+        ])
+        recipe_ids = Recipe.objects.values_list("id", flat=True)
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.id)
+            for recipe_id in recipe_ids
+        ])
+        Recipe.ingredients.through.objects.bulk_create([
+            Recipe.ingredients.through(
+                recipe_id=recipe_id, ingredient_id=ingredient.id
+            )
+            for recipe_id in recipe_ids
+        ])
+
+        query_counts = []
+        for page_size in (1, 500):
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(RECIPES_URL, {"page_size": page_size})
+            self.assertEqual(len(res.data['results']), page_size)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.assertEqual(query_counts[1], 3)
+
+    def test_view_recipe_detail(self):
+        """Test viewing a recipe detail"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+
+        res = self.client.get(detail_url(recipe.id))
+        serializer = RecipeDetailSerializer(recipe)
+
+        self.assertEqual(res.data, serializer.data)
+
+    def test_create_recipe_with_tags_and_ingredients(self):
+        """Test creating a recipe with tags and ingredients"""
+        tag = Tag.objects.create(user=self.user, name="Dessert")
+        ingredient = Ingredient.objects.create(user=self.user, name="Sugar")
+        payload = {
+            "title": "Cheesecake",
+            "tags": [tag.id],
+            "ingredients": [ingredient.id],
+            "time_minutes": 60,
+            "price": 20.00
+        }
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_create_recipe_with_other_users_tag_fail(self):
+        """Test that a recipe cant use tags owned by another user"""
+        user2 = get_user_model().objects.create_user(
+            email_add="user2@firstapp.com",
+            password="testuser2"
+        )
+        tag = Tag.objects.create(user=user2, name="Dessert")
+        payload = {
+            "title": "Cheesecake",
+            "tags": [tag.id],
+            "ingredients": [],
+            "time_minutes": 60,
+            "price": 20.00
+        }
+        res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_partial_update_recipe(self):
+        """Test updating a recipe with patch"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        new_tag = Tag.objects.create(user=self.user, name="Curry")
+
+        payload = {"title": "Chicken tikka", "tags": [new_tag.id]}
+        res = self.client.patch(detail_url(recipe.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, payload['title'])
+        self.assertEqual(list(recipe.tags.all()), [new_tag])
+
+    def test_update_query_count_constant(self):
+        """
+        Test that updating a recipe takes the same number of queries with
+        1 ingredient as with 38, whose ids are checked with one query
+        """
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(user=self.user, name="Ingredient %d" % i)
+            for i in range(40)
+        ])
+        recipe = sample_recipe(user=self.user)
+        recipe.ingredients.add(ingredients[0])
+
+        query_counts = []
+        # Each update removes one ingredient and adds the others
+        for new_ingredients in (ingredients[1:2], ingredients[2:]):
+            payload = {"ingredients": [i.id for i in new_ingredients]}
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.patch(detail_url(recipe.id), payload)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            query_counts.append(len(queries))
+
+        self.assertEqual(recipe.ingredients.count(), 38)
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_update_other_users_recipe_fail(self):
+        """Test that a user cant update another user's recipe"""
+        user2 = get_user_model().objects.create_user(
+            email_add="user2@firstapp.com",
+            password="testuser2"
+        )
+        recipe = sample_recipe(user=user2)
+
+        res = self.client.patch(detail_url(recipe.id), {"title": "Mine"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_filter_recipes_by_tags(self):
+        """Test returning recipes with any of the given tags"""
+        recipe1 = sample_recipe(user=self.user, title="Thai curry")
+        recipe2 = sample_recipe(user=self.user, title="Aubergine tahini")
+        recipe3 = sample_recipe(user=self.user, title="Fish and chips")
+        tag1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag2 = Tag.objects.create(user=self.user, name="Vegetarian")
+        recipe1.tags.add(tag1)
+        recipe2.tags.add(tag1, tag2)
+        recipe3.tags.add(tag2)
+
+        res = self.client.get(RECIPES_URL, {"tags": "%d" % tag1.id})
+        ids = {recipe['id'] for recipe in res.data['results']}
+
+        self.assertEqual(ids, {recipe1.id, recipe2.id})
+
+        res = self.client.get(
+            RECIPES_URL, {"tags": "%d,%d" % (tag1.id, tag2.id)}
+        )
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_filter_recipes_matching_all_tags(self):
+        """Test returning recipes that have every one of the given tags"""
+        recipe1 = sample_recipe(user=self.user, title="Thai curry")
+        recipe2 = sample_recipe(user=self.user, title="Aubergine tahini")
+        tag1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag2 = Tag.objects.create(user=self.user, name="Vegetarian")
+        recipe1.tags.add(tag1)
+        recipe2.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {
+            "tags": "%d,%d" % (tag1.id, tag2.id),
+            "match": "all"
+        })
+        ids = [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(ids, [recipe2.id])
+
+    def test_filter_recipes_by_tags_and_ingredients(self):
+        """Test that tag and ingredient filters are combined"""
+        recipe1 = sample_recipe(user=self.user, title="Posh beans on toast")
+        recipe2 = sample_recipe(user=self.user, title="Chicken cacciatore")
+        tag = Tag.objects.create(user=self.user, name="Quick")
+        ingredient = Ingredient.objects.create(user=self.user, name="Beans")
+        recipe1.tags.add(tag)
+        recipe1.ingredients.add(ingredient)
+        recipe2.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL, {
+            "tags": "%d" % tag.id,
+            "ingredients": "%d" % ingredient.id
+        })
+        ids = [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_invalid_ids(self):
+        """Test that non numeric ids are rejected"""
+        res = self.client.get(RECIPES_URL, {"tags": "1,vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes(self):
+        """Test searching recipes by title, tag and ingredient names"""
+        recipe1 = sample_recipe(user=self.user, title="Lemon drizzle cake")
+        recipe2 = sample_recipe(user=self.user, title="Roast chicken")
+        recipe3 = sample_recipe(user=self.user, title="Fish pie")
+        recipe2.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Lemons")
+        )
+        recipe3.tags.add(Tag.objects.create(user=self.user, name="Lemony"))
+
+        res = self.client.get(RECIPES_URL, {"q": "lemon"})
+        ids = [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # Title matches rank above ingredient matches
+        self.assertEqual(ids[0], recipe1.id)
+        self.assertEqual(set(ids), {recipe1.id, recipe2.id})
+
+    def test_search_follows_renamed_tag(self):
+        """Test that renaming a tag updates the search of its recipes"""
+        recipe = sample_recipe(user=self.user, title="Pancakes")
+        tag = Tag.objects.create(user=self.user, name="Breakfast")
+        recipe.tags.add(tag)
+        tag.name = "Brunch"
+        tag.save()
+
+        res = self.client.get(RECIPES_URL, {"q": "brunch"})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+        recipe.tags.clear()
+        res = self.client.get(RECIPES_URL, {"q": "brunch"})
+
+        self.assertEqual(len(res.data['results']), 0)
+
+    def test_search_results_paginated(self):
+        """Test that search results are paged by rank"""
+        for i in range(5):
+            sample_recipe(user=self.user, title="Tomato soup %d" % i)
+
+        res = self.client.get(RECIPES_URL, {"q": "tomato", "page_size": 3})
+        first_page = [recipe['id'] for recipe in res.data['results']]
+        res = self.client.get(res.data['next'])
+        second_page = [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(len(first_page), 3)
+        self.assertEqual(len(second_page), 2)
+        self.assertFalse(set(first_page) & set(second_page))
@@ -0,0 +1,195 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient, CollectionVersion
+
+RECIPES_URL = reverse("recipe:recipe-list")
+ADD_URL = reverse("recipe:recipe-add-links")
+REMOVE_URL = reverse("recipe:recipe-remove-links")
+REPLACE_URL = reverse("recipe:recipe-replace-links")
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        "title": "Sample recipe",
+        "time_minutes": 10,
+        "price": 5.00
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class Public_Recipe_Links_API_Test(TestCase):
+    """Test that changing links requires authentication"""
+
+    def test_login_required(self):
+        res = APIClient().post(ADD_URL, {"recipes": [1], "tags": [1]},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class Private_Recipe_Links_API_Test(TestCase):
+    """Test adding, removing and replacing links of many recipes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="testuser1"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.recipes = [
+            sample_recipe(self.user, title="Curry"),
+            sample_recipe(self.user, title="Stew"),
+        ]
+        self.vegan = Tag.objects.create(user=self.user, name="Vegan")
+        self.spicy = Tag.objects.create(user=self.user, name="Spicy")
+        self.salt = Ingredient.objects.create(user=self.user, name="Salt")
+
+    def recipe_ids(self):
+        return [recipe.id for recipe in self.recipes]
+
+    def tag_names(self, recipe):
+        return sorted(tag.name for tag in recipe.tags.all())
+
+    def test_add_links(self):
+        """Test linking many recipes to tags, keeping existing links"""
+        self.recipes[0].tags.add(self.vegan)
+        version = CollectionVersion.objects.current(self.user.id, 'tag')[0]
+
+        res = self.client.post(ADD_URL, {
+            "recipes": self.recipe_ids(),
+            "tags": [self.vegan.id, self.spicy.id],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"tags": {"added": 3, "removed": 0}})
+        for recipe in self.recipes:
+            self.assertEqual(self.tag_names(recipe), ["Spicy", "Vegan"])
+        self.assertGreater(
+            CollectionVersion.objects.current(self.user.id, 'tag')[0],
+            version
+        )
+
+    def test_added_links_searchable(self):
+        """Test that recipes are found by the names of added tags"""
+        self.client.post(ADD_URL, {
+            "recipes": [self.recipes[1].id],
+            "ingredients": [self.salt.id],
+        }, format='json')
+
+        res = self.client.get(RECIPES_URL, {"q": "salt"})
+
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [self.recipes[1].id]
+        )
+
+    def test_remove_links(self):
+        """Test unlinking many recipes from ingredients"""
+        for recipe in self.recipes:
+            recipe.ingredients.add(self.salt)
+            recipe.tags.add(self.vegan)
+
+        res = self.client.post(REMOVE_URL, {
+            "recipes": self.recipe_ids(),
+            "ingredients": [self.salt.id],
+        }, format='json')
+
+        self.assertEqual(res.data, {"ingredients": {"added": 0, "removed": 2}})
+        self.assertFalse(Recipe.ingredients.through.objects.exists())
+        self.assertEqual(Recipe.tags.through.objects.count(), 2)
+
+    def test_replace_links(self):
+        """Test that replaced tags are the only ones left on each recipe"""
+        self.recipes[0].tags.add(self.vegan)
+        self.recipes[1].tags.add(self.spicy)
+        self.recipes[1].ingredients.add(self.salt)
+
+        res = self.client.post(REPLACE_URL, {
+            "recipes": self.recipe_ids(),
+            "tags": [self.spicy.id],
+        }, format='json')
+
+        self.assertEqual(res.data, {"tags": {"added": 1, "removed": 1}})
+        for recipe in self.recipes:
+            self.assertEqual(self.tag_names(recipe), ["Spicy"])
+        self.assertEqual(list(self.recipes[1].ingredients.all()), [self.salt])
+
+    def test_replace_with_empty_list(self):
+        """Test that replacing with no tags clears them"""
+        self.recipes[0].tags.add(self.vegan, self.spicy)
+
+        res = self.client.post(REPLACE_URL, {
+            "recipes": self.recipe_ids(),
+            "tags": [],
+        }, format='json')
+
+        self.assertEqual(res.data, {"tags": {"added": 0, "removed": 2}})
+        self.assertFalse(Recipe.tags.through.objects.exists())
+
+    def test_other_users_ids_rejected(self):
+        """Test that recipes and tags of other users are rejected"""
+        user2 = get_user_model().objects.create_user(
+            email_add="user2@firstapp.com",
+            password="testuser2"
+        )
+        recipe = sample_recipe(user2)
+        tag = Tag.objects.create(user=user2, name="Dessert")
+
+        res = self.client.post(ADD_URL, {
+            "recipes": [self.recipes[0].id, recipe.id],
+            "tags": [self.vegan.id, tag.id],
+            "ingredients": [self.salt.id],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['recipes'], ['Invalid ids: %d' % recipe.id])
+        self.assertEqual(res.data['tags'], ['Invalid ids: %d' % tag.id])
+        self.assertNotIn('ingredients', res.data)
+        self.assertFalse(Recipe.tags.through.objects.exists())
+
+    def test_relation_required(self):
+        """Test that either tags or ingredients must be given"""
+        res = self.client.post(ADD_URL, {"recipes": self.recipe_ids()},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_constant(self):
+        """
+        Test that a change takes the same number of queries for 2 links as
+        for 50 recipes with 40 ingredients each
+        """
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(user=self.user, name="Ingredient %d" % i)
+            for i in range(40)
+        ])
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=self.user, title="Recipe %d" % i,
+                   time_minutes=10, price=5)
+            for i in range(50)
+        ])
+
+        query_counts = []
+        for recipe_ids, ingredient_ids in (
+                (self.recipe_ids()[:1], [self.salt.id]),
+                ([r.id for r in recipes], [i.id for i in ingredients])):
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(REPLACE_URL, {
+                    "recipes": recipe_ids,
+                    "ingredients": ingredient_ids,
+                }, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            query_counts.append(len(queries))
+
+        self.assertEqual(res.data['ingredients']['added'], 2000)
+        self.assertEqual(query_counts[0], query_counts[1])
@@ -0,0 +1,120 @@
+import os
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from core.tests.utils import benchmark, median_time
+from recipe.serializers import TagSerializer, IngredientSerializer, \
+                               RecipeAttributeRowSerializer
+
+TAG_URL = reverse("recipe:tag-list")
+
+
+def serialize_rows(queryset):
+    """Serialize a queryset through the row serializer"""
+    rows = queryset.values_list(
+        *RecipeAttributeRowSerializer.row_fields, named=True
+    )
+    return RecipeAttributeRowSerializer(rows, many=True).data
+
+
+class Row_Serializer_Test(TestCase):
+    """Test the row serializer against the model serializers"""
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="awesome1"
+        )
+
+    def test_tag_parity(self):
+        """Test that tag rows render exactly like the TagSerializer"""
+        for name in ("Vegan", "Crème brûlée", "", "\"Quoted\" ✓"):
+            Tag.objects.create(user=self.user, name=name)
+        tags = Tag.objects.order_by("-name", "-id")
+
+        expected = TagSerializer(tags, many=True).data
+        data = serialize_rows(tags)
+
+        self.assertEqual(data, expected)
+        self.assertEqual(
+            JSONRenderer().render(data), JSONRenderer().render(expected)
+        )
+
+    def test_ingredient_parity(self):
+        """Test that ingredient rows render like the IngredientSerializer"""
+        for name in ("Salt", "Pepper"):
+            Ingredient.objects.create(user=self.user, name=name)
+        ingredients = Ingredient.objects.order_by("-name", "-id")
+
+        self.assertEqual(
+            JSONRenderer().render(serialize_rows(ingredients)),
+            JSONRenderer().render(
+                IngredientSerializer(ingredients, many=True).data
+            )
+        )
+
+    def test_list_pages_rows(self):
+        """Test that the list endpoint pages over rows"""
+        for i in range(3):
+            Tag.objects.create(user=self.user, name="Tag %d" % i)
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        res = client.get(TAG_URL, {"page_size": 2})
+        res2 = client.get(res.data["next"])
+
+        tags = Tag.objects.order_by("-name", "-id")
+        self.assertEqual(
+            res.data["results"] + res2.data["results"],
+            TagSerializer(tags, many=True).data
+        )
+
+
+@benchmark
+class Row_Serializer_Benchmark(TestCase):
+    """
+    Time fetching and serializing BENCHMARK_TAGS tags (10000 by default)
+    with the TagSerializer and with the row serializer, and check the
+    speedup per row against its target
+    """
+    tags = int(os.environ.get('BENCHMARK_TAGS', 10000))
+    target_speedup = float(os.environ.get('ROW_SERIALIZER_TARGET_SPEEDUP', 2))
+    runs = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email_add="bench@firstapp.com",
+            password="benchmark"
+        )
+        Tag.objects.bulk_create([
+            Tag(user=cls.user, name="Tag %06d" % i) for i in range(cls.tags)
+        ])
+
+    def time_per_row(self, serialize):
+        """Return the median cost per row in microseconds"""
+        queryset = Tag.objects.filter(user=self.user).order_by("-name")
+        seconds, data = median_time(
+            lambda: serialize(queryset.all()), self.runs
+        )
+        self.assertEqual(len(data), self.tags)
+        return seconds / self.tags * 1000000
+
+    def test_per_row_cost(self):
+        """Test that the row serializer meets its per row speedup target"""
+        model = self.time_per_row(
+            lambda queryset: TagSerializer(queryset, many=True).data
+        )
+        rows = self.time_per_row(serialize_rows)
+
+        print('\n%d tags, median of %d runs' % (self.tags, self.runs))
+        print('%-18s %8.2f us/row' % ('TagSerializer', model))
+        print('%-18s %8.2f us/row' % ('row serializer', rows))
+        print('%-18s %8.1fx' % ('speedup', model / rows))
+
+        self.assertGreater(model / rows, self.target_speedup)
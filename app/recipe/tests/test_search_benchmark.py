@@ -0,0 +1,84 @@
+import os
+from unittest import skipUnless
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.tests.utils import benchmark, median_time
+
+RECIPES_URL = reverse("recipe:recipe-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+@benchmark
+@skipUnless(connection.vendor == 'postgresql', 'Seeds with generate_series')
+@override_settings(LIST_RESPONSE_CACHE={
+    'BACKEND': 'local', 'MAX_ENTRIES': 0, 'TIMEOUT': 0
+})
+class Recipe_Search_Benchmark(TestCase):
+    """
+    Check search and autocomplete latency against their targets for one
+    user owning BENCHMARK_RECIPES recipes (1M by default) and 50k
+    ingredients
+    """
+    recipes = int(os.environ.get('BENCHMARK_RECIPES', 1000000))
+    search_target_ms = float(os.environ.get('SEARCH_TARGET_MS', 200))
+    autocomplete_target_ms = float(
+        os.environ.get('AUTOCOMPLETE_TARGET_MS', 50)
+    )
+    runs = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email_add="bench@firstapp.com",
+            password="benchmark"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO core_recipe "
+                "(title, user_id, time_minutes, price, link) "
+                "SELECT 'dish' || (i %% 1000) || ' style' || (i %% 37), "
+                "%s, 10, 5, '' FROM generate_series(1, %s) AS i",
+                [cls.user.id, cls.recipes]
+            )
+            cursor.execute(
+                "INSERT INTO core_ingredient (name, user_id, updated_at) "
+                "SELECT substr(md5(i::text), 1, 12), %s, now() "
+                "FROM generate_series(1, 50000) AS i",
+                [cls.user.id]
+            )
+        Recipe.objects.update_search_vector()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def median_latency(self, url, params):
+        """Return the median latency of a request in ms"""
+        seconds, res = median_time(
+            lambda: self.client.get(url, params), self.runs
+        )
+        self.assertEqual(res.status_code, 200)
+        return seconds * 1000
+
+    def test_search_latency(self):
+        """Test that ranked full text search meets its latency target"""
+        latency = self.median_latency(RECIPES_URL, {"q": "dish17"})
+        print('\nsearch over %d recipes: %.1f ms' % (self.recipes, latency))
+
+        self.assertLess(latency, self.search_target_ms)
+
+    def test_autocomplete_latency(self):
+        """Test that ingredient autocomplete meets its latency target"""
+        latency = self.median_latency(INGREDIENTS_URL, {"q": "c4c"})
+        print('\nautocomplete over 50000 ingredients: %.1f ms' % latency)
+
+        self.assertLess(latency, self.autocomplete_target_ms)
@@ -0,0 +1,110 @@
+import json
+import tracemalloc
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import TagSerializer
+from recipe.views import RecipeViewSet, TagView
+
+TAG_URL = reverse("recipe:tag-list")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def read_stream(res):
+    """Consume a streaming response and return the decoded JSON"""
+    return json.loads(b''.join(res.streaming_content).decode('utf-8'))
+
+
+class Streaming_List_Test(TestCase):
+    """Test streaming list responses"""
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="awesome1"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_stream_tags(self):
+        """Test that the whole tag list is streamed as one JSON array"""
+        for i in range(7):
+            Tag.objects.create(user=self.user, name="Tag %d" % i)
+
+        with patch.object(TagView, 'stream_chunk_size', 3):
+            res = self.client.get(TAG_URL, {"stream": 1})
+            data = read_stream(res)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        tags = Tag.objects.filter(user=self.user).order_by("-name", "-id")
+        self.assertEqual(data, TagSerializer(tags, many=True).data)
+
+    def test_stream_empty_list(self):
+        """Test streaming a user without tags"""
+        res = self.client.get(TAG_URL, {"stream": 1})
+
+        self.assertEqual(read_stream(res), [])
+
+    def test_stream_recipes_prefetched_per_chunk(self):
+        """
+        Test that streamed recipes carry their tags and ingredients,
+        prefetched with two queries per chunk
+        """
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        ingredient = Ingredient.objects.create(user=self.user, name="Salt")
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title="Recipe %d" % i,
+                time_minutes=10,
+                price=5
+            )
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+        with patch.object(RecipeViewSet, 'stream_chunk_size', 2), \
+                CaptureQueriesContext(connection) as queries:
+            data = read_stream(self.client.get(RECIPES_URL, {"stream": 1}))
+
+        self.assertEqual(len(data), 5)
+        self.assertEqual(data[0]['title'], "Recipe 4")
+        self.assertEqual(data[0]['tags'], [{'id': tag.id, 'name': "Vegan"}])
+        recipe_queries = [
+            query for query in queries.captured_queries
+            if 'core_recipe_' in query['sql']
+        ]
+        self.assertEqual(len(recipe_queries), 3 * 2)
+
+    def test_stream_memory_flat(self):
+        """
+        Test that peak memory while streaming does not grow with the
+        size of the collection
+        """
+        def peak_memory(count):
+            Tag.objects.filter(user=self.user).delete()
+            Tag.objects.bulk_create([
+                Tag(user=self.user, name="Tag %05d" % i)
+                for i in range(count)
+            ])
+            res = self.client.get(TAG_URL, {"stream": 1})
+            tracemalloc.start()
+            for _ in res.streaming_content:
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return peak
+
+        with patch.object(TagView, 'stream_chunk_size', 100):
+            small = peak_memory(500)
+            large = peak_memory(5000)
+
+        self.assertLess(large, small * 2)
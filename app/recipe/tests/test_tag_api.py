@@ -1,11 +1,14 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
-from core.models import Tag
+from core.models import Tag, Recipe
+from core.query_budget import QueryBudget
 from recipe.serializers import TagSerializer
 
 TAG_URL = reverse("recipe:tag-list")
@@ -20,7 +23,8 @@ class Public_Tag_API_test(TestCase):
         """
         Test that the list of tags cant be accessed without authentication
         """
-        res = self.client.get(TAG_URL)
+        with QueryBudget(0):
+            res = self.client.get(TAG_URL)
 
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
@@ -47,12 +51,13 @@ class Private_Tag_API_Test(TestCase):
             user=self.user,
             name="NonVeg"
         )
-        res = self.client.get(TAG_URL)
+        with QueryBudget(2):
+            res = self.client.get(TAG_URL)
         tags_model = Tag.objects.all().order_by("-name")
         serializer = TagSerializer(tags_model, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_tags_user_authenticated(self):
         """
@@ -74,18 +79,21 @@ class Private_Tag_API_Test(TestCase):
             user=user2,
             name="Dessert"
         )
-        res = self.client.get(TAG_URL)
+        with QueryBudget(2):
+            res = self.client.get(TAG_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
-        self.assertEqual(res.data[0]['name'], tag1.name)
-        self.assertEqual(res.data[1]['name'], tag2.name)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertEqual(res.data['results'][0]['name'], tag1.name)
+        self.assertEqual(res.data['results'][1]['name'], tag2.name)
 
     def test_create_tag_success(self):
         """Test if the tag is created successfully by the API"""
         payload = {
             "name": "Vegan"
         }
-        res = self.client.post(TAG_URL, payload)
+        # The first write also creates the collection version row
+        with QueryBudget(7):
+            res = self.client.post(TAG_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
         exists = Tag.objects.filter(
@@ -99,6 +107,124 @@ class Private_Tag_API_Test(TestCase):
         payload = {
             "name": ""
         }
-        res = self.client.post(TAG_URL, payload)
+        with QueryBudget(0):
+            res = self.client.post(TAG_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_tags_paginated(self):
+        """Test that tags are returned one keyset page at a time"""
+        for name in ("Breakfast", "Dessert", "NonVeg", "Vegan"):
+            Tag.objects.create(user=self.user, name=name)
+
+        with QueryBudget(2):
+            res = self.client.get(TAG_URL, {"page_size": 3})
+        names = [item['name'] for item in res.data['results']]
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(names, ["Vegan", "NonVeg", "Dessert"])
+
+        with QueryBudget(2):
+            res = self.client.get(res.data['next'])
+        names = [item['name'] for item in res.data['results']]
+        self.assertEqual(names, ["Breakfast"])
+        self.assertIsNone(res.data['next'])
+
+    def test_create_duplicate_tag_fail(self):
+        """Test that a user cant create two tags with the same name"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        with QueryBudget(1):
+            res = self.client.post(TAG_URL, {"name": "Vegan"})
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            Tag.objects.filter(user=self.user, name="Vegan").count(), 1
+        )
+
+    def test_bulk_create_tags(self):
+        """Test that a list of tags is created with a single insert"""
+        payload = [{"name": "Vegan"}, {"name": "Dessert"}, {"name": "Curry"}]
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(TAG_URL, payload, format="json")
+        inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "core_tag"')
+        ]
+        self.assertEqual(len(inserts), 1)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [item['name'] for item in res.data],
+            ["Vegan", "Dessert", "Curry"]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_list_not_modified(self):
+        """
+        Test that a list request carrying the current ETag is answered
+        with 304 without running the list query
+        """
+        Tag.objects.create(user=self.user, name="Vegan")
+        res = self.client.get(TAG_URL)
+        self.assertIn('ETag', res)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAG_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_modified_after_write(self):
+        """Test that creating a tag invalidates the list ETag"""
+        res = self.client.get(TAG_URL)
+        etag = res['ETag']
+        self.client.post(TAG_URL, {"name": "Vegan"})
+
+        res = self.client.get(TAG_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_etag_depends_on_page(self):
+        """Test that different pages of the list get different ETags"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        first = self.client.get(TAG_URL)
+        second = self.client.get(TAG_URL, {"page_size": 1})
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_retrieve_tags_assigned_only(self):
+        """Test filtering tags by those assigned to recipes"""
+        tag1 = Tag.objects.create(user=self.user, name="Breakfast")
+        Tag.objects.create(user=self.user, name="Lunch")
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title="Coriander eggs on toast",
+            time_minutes=10,
+            price=5.00
+        )
+        recipe.tags.add(tag1)
+
+        with QueryBudget(2):
+            res = self.client.get(TAG_URL, {"assigned_only": 1})
+        names = [item['name'] for item in res.data['results']]
+
+        self.assertEqual(names, [tag1.name])
+
+    def test_assigned_only_changes_with_recipe_tags(self):
+        """Test that tagging a recipe invalidates the tag list ETag"""
+        tag = Tag.objects.create(user=self.user, name="Breakfast")
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title="Porridge",
+            time_minutes=5,
+            price=1.00
+        )
+        etag = self.client.get(TAG_URL, {"assigned_only": 1})['ETag']
+        recipe.tags.add(tag)
+
+        res = self.client.get(
+            TAG_URL, {"assigned_only": 1}, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import jobs
+from core.models import Recipe, Tag
+from recipe.tasks import rebuild_search_vectors
+
+
+class RebuildSearchVectorsTaskTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="testuser1"
+        )
+        self.recipes = Recipe.objects.bulk_create([
+            Recipe(user=self.user, title="Curry %d" % n, time_minutes=10,
+                   price=5)
+            for n in range(5)
+        ])
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in self.recipes
+        ])
+
+    def test_rebuild_all(self):
+        """Test rebuilding the search vectors of every recipe in chunks"""
+        job = jobs.enqueue('rebuild_search_vectors', {'chunk_size': 2})
+
+        self.assertEqual(rebuild_search_vectors(job), {'recipes': 5})
+        self.assertEqual(
+            Recipe.objects.filter(search_vector='vegan').count(), 5
+        )
+
+    def test_rebuild_listed(self):
+        """Test rebuilding the search vectors of some recipes"""
+        job = jobs.enqueue('rebuild_search_vectors', {
+            'recipe_ids': [self.recipes[1].id]
+        })
+
+        self.assertEqual(rebuild_search_vectors(job), {'recipes': 1})
+        self.assertEqual(
+            list(Recipe.objects.filter(search_vector='vegan')),
+            [self.recipes[1]]
+        )
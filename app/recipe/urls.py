@@ -5,8 +5,14 @@ from recipe import views
 router = DefaultRouter()
 router.register('tags', views.TagView)
 router.register('ingredients', views.IngredientView)
+router.register('recipes', views.RecipeViewSet)
 
 app_name = 'recipe'
 urlpatterns = [
     path('', include(router.urls)),
+    path(
+        'cache-stats/',
+        views.ListCacheStatsView.as_view(),
+        name='cache-stats'
+    ),
 ]
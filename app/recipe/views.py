@@ -1,35 +1,181 @@
-from rest_framework import mixins, viewsets
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
-from recipe.serializers import TagSerializer, IngredientSerializer
+import hashlib
 
-from core.models import Tag, Ingredient
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Exists, F, FloatField, IntegerField, OuterRef, \
+                             Q, Value
+from django.db.models.functions import Cast
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from recipe.cache import get_list_cache
+from recipe.pagination import KeysetPagination, RecipePagination, \
+                              RecipeSearchPagination
+from recipe.streaming import StreamingListMixin
+from recipe.serializers import TagSerializer, IngredientSerializer, \
+                               RecipeSerializer, RecipeDetailSerializer, \
+                               RecipeAttributeRowSerializer, \
+                               RecipeLinksSerializer
 
+from core.models import Tag, Ingredient, Recipe, CollectionVersion
+from user.authentication import CachedTokenAuthentication
 
-class BaseRecipeAttributeView(viewsets.GenericViewSet,
+
+def params_to_ints(qs):
+    """Convert a comma separated string of ids to a list of integers"""
+    try:
+        return [int(str_id) for str_id in qs.split(',')]
+    except ValueError:
+        raise ValidationError({'detail': 'Expected comma separated ids'})
+
+
+def recipe_link_exists(relation, **lookups):
+    """
+    Return an EXISTS subquery over the through table of a recipe relation,
+    which unlike a join never needs a DISTINCT over the matched rows
+    """
+    through = getattr(Recipe, relation).through
+    return Exists(through.objects.filter(**lookups))
+
+
+class BaseRecipeAttributeView(StreamingListMixin,
+                              viewsets.GenericViewSet,
                               mixins.ListModelMixin,
                               mixins.CreateModelMixin):
     """View to list recipe attributes"""
     # serializer_class = TagSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    row_serializer_class = RecipeAttributeRowSerializer
+    query_budget = 7
 
     def get_queryset(self):
         """
-        Return the list of attributes for the authenticated user
+        Return the list of attributes for the authenticated user,
+        optionally only those matching the q search or assigned to at
+        least one recipe
+        """
+        queryset = self.queryset.filter(user=self.request.user)
+        search = self.request.query_params.get('q')
+        if search:
+            # Prefix or typo tolerant match, both served by trigram indexes
+            queryset = queryset.filter(
+                Q(name__istartswith=search) | Q(name__trigram_similar=search)
+            )
+        if self.request.query_params.get('assigned_only') in ('1', 'true'):
+            fk = '%s_id' % self.queryset.model._meta.model_name
+            queryset = queryset.annotate(assigned=recipe_link_exists(
+                self.recipe_relation, **{fk: OuterRef('pk')}
+            )).filter(assigned=True)
+        if self.action == 'list':
+            # Named rows so the paginator can read the cursor position
+            queryset = queryset.values_list(
+                *self.row_serializer_class.row_fields, named=True
+            )
+        return queryset.order_by("-name", "-id")
+
+    def list(self, request, *args, **kwargs):
+        """
+        List the attributes. Conditional requests are answered from the
+        collection version alone and unchanged lists from the response
+        cache, both without running the list query. Streamed lists are
+        never cached.
+        """
+        version, updated_at = CollectionVersion.objects.current(
+            request.user.id, self.queryset.model._meta.model_name
+        )
+        key = self.get_list_key(request, version, updated_at)
+        etag = quote_etag(key)
+        last_modified = updated_at and int(updated_at.timestamp())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None and self.stream_requested():
+            response = self.stream_list(
+                self.filter_queryset(self.get_queryset())
+            )
+        if response is None:
+            response = self.get_cached_list(key)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+            response.add_post_render_callback(
+                lambda rendered: self.cache_list(key, rendered)
+            )
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Authorization',))
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_list_key(self, request, version, updated_at):
+        """
+        Return a key identifying a list response for the collection
+        version, used both as ETag and as response cache key
         """
-        return self.queryset.filter(user=self.request.user).order_by("-name")
+        key = '%s:%s:%d:%s:%s:%s' % (
+            self.queryset.model._meta.model_name,
+            request.user.id,
+            version,
+            updated_at and updated_at.isoformat(),
+            request.get_full_path(),
+            request.accepted_media_type
+        )
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def get_cached_list(self, key):
+        """Return the cached list response for the key, if any"""
+        entry = get_list_cache().get(key)
+        if entry is None:
+            return None
+        content, content_type = entry
+        return HttpResponse(content, content_type=content_type)
+
+    def cache_list(self, key, response):
+        """Store a rendered list response in the response cache"""
+        if response.status_code == 200:
+            get_list_cache().set(
+                key, response.content, response['Content-Type']
+            )
+
+    def get_serializer_class(self):
+        """Serialize listed rows without building model instances"""
+        if self.action == 'list':
+            return self.row_serializer_class
+        return self.serializer_class
+
+    def get_serializer(self, *args, **kwargs):
+        """Accept a JSON array to create many attributes in one request"""
+        if isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
 
     def perform_create(self, serializer):
         """Create a new recipe attribute"""
         serializer.save(user=self.request.user)
 
 
+class ListCacheStatsView(APIView):
+    """View to show the hit and miss counts of the list response cache"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_list_cache().stats())
+
+
 class TagView(BaseRecipeAttributeView):
     """View to list tags"""
     serializer_class = TagSerializer
     # For ListModelMixin
     queryset = Tag.objects.all()
+    recipe_relation = 'tags'
 
 
 class IngredientView(BaseRecipeAttributeView):
@@ -38,3 +184,132 @@ class IngredientView(BaseRecipeAttributeView):
     serializer_class = IngredientSerializer
     # For ListModelMixin
     queryset = Ingredient.objects.all()
+    recipe_relation = 'ingredients'
+
+
+class RecipeViewSet(StreamingListMixin,
+                    viewsets.GenericViewSet,
+                    mixins.ListModelMixin,
+                    mixins.RetrieveModelMixin,
+                    mixins.CreateModelMixin,
+                    mixins.UpdateModelMixin):
+    """View to manage recipes"""
+    serializer_class = RecipeSerializer
+    queryset = Recipe.objects.all()
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    pagination_class = RecipePagination
+    query_budget = 20
+
+    def get_queryset(self):
+        """
+        Return the recipes of the authenticated user, filtered by the ids in
+        the tags and ingredients parameters and by the q full text search,
+        with their tags and ingredients prefetched so a page costs the same
+        number of queries whatever its size
+        """
+        queryset = self.queryset.filter(user=self.request.user)
+        match_all = self.request.query_params.get('match') == 'all'
+        for relation, fk in (('tags', 'tag_id'),
+                             ('ingredients', 'ingredient_id')):
+            ids = self.request.query_params.get(relation)
+            if ids:
+                queryset = self.filter_by_relation(
+                    queryset, relation, fk, params_to_ints(ids), match_all
+                )
+        search = self.request.query_params.get('q')
+        if search:
+            queryset = self.search(queryset, search)
+        return queryset.prefetch_related(
+            'tags', 'ingredients'
+        ).order_by('-id')
+
+    def search(self, queryset, text):
+        """
+        Keep the recipes whose title, tags or ingredients match the text,
+        annotated with their rank scaled to an integer so search results
+        can be paged on it exactly
+        """
+        query = SearchQuery(text, config='english')
+        rank = SearchRank(F('search_vector'), query) * Value(
+            1000000.0, output_field=FloatField()
+        )
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(rank, IntegerField())
+        )
+
+    @property
+    def paginator(self):
+        """Page search results by rank instead of by recency"""
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get('q'):
+                self._paginator = RecipeSearchPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def filter_by_relation(self, queryset, relation, fk, ids, match_all):
+        """
+        Keep the recipes linked to all of the ids when match_all is set,
+        otherwise to any of them
+        """
+        if match_all:
+            conditions = {
+                '%s_%d' % (fk, pk): recipe_link_exists(
+                    relation, recipe_id=OuterRef('pk'), **{fk: pk}
+                )
+                for pk in set(ids)
+            }
+        else:
+            conditions = {
+                '%s_any' % fk: recipe_link_exists(
+                    relation,
+                    recipe_id=OuterRef('pk'),
+                    **{'%s__in' % fk: ids}
+                )
+            }
+        return queryset.annotate(**conditions).filter(
+            **{name: True for name in conditions}
+        )
+
+    def list(self, request, *args, **kwargs):
+        """List the recipes, streaming all of them when asked to"""
+        if self.stream_requested():
+            return self.stream_list(self.filter_queryset(self.get_queryset()))
+        return super().list(request, *args, **kwargs)
+
+    def get_serializer_class(self):
+        """Return the nested serializer when reading recipes"""
+        if self.action in ('list', 'retrieve'):
+            return RecipeDetailSerializer
+        if self.action in ('add_links', 'remove_links', 'replace_links'):
+            return RecipeLinksSerializer
+        return self.serializer_class
+
+    def change_links(self, request, mode):
+        """Change the tags and ingredients of many recipes at once"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.save(mode=mode), status=status.HTTP_200_OK)
+
+    @action(methods=['post'], detail=False, url_path='links/add')
+    def add_links(self, request):
+        """Link every listed recipe to every listed tag and ingredient"""
+        return self.change_links(request, 'add')
+
+    @action(methods=['post'], detail=False, url_path='links/remove')
+    def remove_links(self, request):
+        """Unlink the listed recipes from the listed tags and ingredients"""
+        return self.change_links(request, 'remove')
+
+    @action(methods=['post'], detail=False, url_path='links/replace')
+    def replace_links(self, request):
+        """
+        Make the listed tags or ingredients the only ones of every listed
+        recipe, for the relations given
+        """
+        return self.change_links(request, 'replace')
+
+    def perform_create(self, serializer):
+        """Create a new recipe"""
+        serializer.save(user=self.request.user)
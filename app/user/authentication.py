@@ -0,0 +1,118 @@
+import pickle
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.cache import LRUCache
+
+
+class TokenCache:
+    """
+    Two tier cache of authenticated (user, token) pairs keyed by token.
+
+    Every process keeps a small LRU with a short TTL in front of an optional
+    shared Django cache. With the shared tier, invalidation replaces a small
+    version key of the token there, and entries cached under an older
+    version are dropped by every process on their next hit. Without it,
+    other processes keep their local copy until its TTL runs out.
+
+    The local tier holds the pairs pickled, like the shared tier, so every
+    request gets instances of its own to change.
+    """
+    key_prefix = 'auth-token:'
+    version_prefix = 'auth-token-version:'
+
+    def __init__(self):
+        config = settings.TOKEN_AUTH_CACHE
+        self.local_timeout = config['LOCAL_TIMEOUT']
+        self.shared_timeout = config['SHARED_TIMEOUT']
+        self.local = LRUCache(config['LOCAL_MAX_ENTRIES'])
+        self.shared = None
+        if config['SHARED_CACHE']:
+            self.shared = caches[config['SHARED_CACHE']]
+
+    def get(self, key):
+        """Return the cached (user, token) pair for a token key, if any"""
+        entry = self.local.get(key)
+        if entry is not None:
+            version, pickled = entry
+            if self.shared is None or self.version(key) == version:
+                return pickle.loads(pickled)
+            self.local.delete(key)
+        if self.shared is None:
+            return None
+
+        values = self.shared.get_many(
+            [self.key_prefix + key, self.version_prefix + key]
+        )
+        entry = values.get(self.key_prefix + key)
+        version = values.get(self.version_prefix + key)
+        if entry is None or entry[0] != version:
+            return None
+        self.set_local(key, entry[1], version)
+        return entry[1]
+
+    def version(self, key):
+        """
+        Return the shared version of a token key. Callers read it before
+        looking the token up, so that what they cache is stamped with the
+        version it was read under.
+        """
+        if self.shared is None:
+            return None
+        return self.shared.get(self.version_prefix + key)
+
+    def set_local(self, key, credentials, version):
+        self.local.set(
+            key,
+            (version, pickle.dumps(credentials, pickle.HIGHEST_PROTOCOL)),
+            self.local_timeout
+        )
+
+    def set(self, key, credentials, version=None):
+        self.set_local(key, credentials, version)
+        if self.shared is not None:
+            self.shared.set(
+                self.key_prefix + key, (version, credentials),
+                self.shared_timeout
+            )
+
+    def invalidate(self, key):
+        """Forget the credentials cached for a token key"""
+        self.local.delete(key)
+        if self.shared is not None:
+            # The version outlives every entry stamped with an older one
+            self.shared.set(
+                self.version_prefix + key, uuid.uuid4().hex,
+                max(self.local_timeout, self.shared_timeout)
+            )
+            self.shared.delete(self.key_prefix + key)
+
+    def invalidate_user(self, user_id):
+        """Forget the credentials cached for every token of a user"""
+        keys = Token.objects.filter(user_id=user_id).values_list(
+            'key', flat=True
+        )
+        for key in keys:
+            self.invalidate(key)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that only looks the token up in the database
+    when it is not already cached
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            version = token_cache.version(key)
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials, version)
+        return credentials
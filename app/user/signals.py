@@ -0,0 +1,33 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, using, **kwargs):
+    """
+    Stop accepting a deleted token from the cache once the deletion commits.
+    Invalidating earlier would let a concurrent request cache the token
+    again before it is gone.
+    """
+    transaction.on_commit(
+        partial(token_cache.invalidate, instance.key), using=using
+    )
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_saved_user(sender, instance, created, using, **kwargs):
+    """
+    Drop the cached credentials of a user whenever a save of it commits, so
+    a deactivation, password change or profile edit is seen at once
+    """
+    if not created:
+        transaction.on_commit(
+            partial(token_cache.invalidate_user, instance.pk), using=using
+        )
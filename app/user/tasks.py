@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from core.jobs import PermanentError, set_progress, task
+from core.models import Ingredient, Recipe, Tag
+
+PURGE_BATCH_SIZE = 5000
+
+# The models holding the data of a user in the order they are purged, each
+# with the relations and through table columns of the links pointing at it
+PURGE_STEPS = (
+    (Recipe, (('tags', 'recipe'), ('ingredients', 'recipe'))),
+    (Tag, (('tags', 'target'),)),
+    (Ingredient, (('ingredients', 'target'),)),
+)
+
+
+def purge_batch(model, links, user_id, batch_size):
+    """
+    Delete up to batch_size rows of the model owned by the user, and the
+    links to them, by id with one statement per table. This skips the
+    collector and signals of Model.delete(), which would load every related
+    row first. Return how many rows went from each table.
+    """
+    table = model._meta.db_table
+    qn = connection.ops.quote_name
+    deleted = {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT id FROM %s WHERE user_id = %%s ORDER BY id LIMIT %%s'
+            % qn(table),
+            [user_id, batch_size]
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        for relation, column in links:
+            link_table = Recipe.objects.link_table(relation)
+            cursor.execute(
+                'DELETE FROM %s WHERE %s = ANY(%%s)' % (
+                    link_table['table'], link_table[column]
+                ),
+                [ids]
+            )
+            through = Recipe._meta.get_field(relation).m2m_db_table()
+            deleted[through] = cursor.rowcount
+        cursor.execute('DELETE FROM %s WHERE id = ANY(%%s)' % qn(table),
+                       [ids])
+        deleted[table] = cursor.rowcount
+    return deleted
+
+
+@task(max_attempts=5, concurrency=2, timeout=600)
+def delete_user(job):
+    """
+    Delete the deactivated user in user_id with all of their data. Rows go
+    a bounded batch at a time, each committed on its own, so locks stay
+    short and memory flat, and a retry resumes where the last attempt
+    stopped. The counts of deleted rows are reported as progress.
+    """
+    user_id = job.payload['user_id']
+    batch_size = job.payload.get('batch_size', PURGE_BATCH_SIZE)
+    if get_user_model().objects.filter(pk=user_id, is_active=True).exists():
+        raise PermanentError(
+            'User %s is active, deactivate it first' % user_id
+        )
+
+    deleted = dict((job.progress or {}).get('deleted', {}))
+    for model, links in PURGE_STEPS:
+        while True:
+            counts = purge_batch(model, links, user_id, batch_size)
+            for table, count in counts.items():
+                deleted[table] = deleted.get(table, 0) + count
+            set_progress(job, {'deleted': deleted})
+            if counts[model._meta.db_table] < batch_size:
+                break
+
+    # Only a few rows are left, such as the token and collection versions
+    get_user_model().objects.filter(pk=user_id).delete()
+    return {'deleted': deleted}
@@ -0,0 +1,155 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import CollectionVersion, Ingredient, Job, Recipe, Tag
+from user import tasks
+
+MANAGE_USER_URL = reverse("user:manage")
+
+
+def create_account(email_add, recipes=3):
+    """Create a user with linked recipes, tags and ingredients"""
+    user = get_user_model().objects.create_user(
+        email_add=email_add,
+        password="awesome1"
+    )
+    tag = Tag.objects.create(user=user, name="Vegan")
+    ingredient = Ingredient.objects.create(user=user, name="Salt")
+    for n in range(recipes):
+        recipe = Recipe.objects.create(
+            user=user, title="Recipe %d" % n, time_minutes=10, price=5
+        )
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+    return user
+
+
+class AccountDeletionAPITests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = create_account("user1@firstapp.com")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_delete_account(self):
+        """
+        Test that deleting the account deactivates it and revokes its token
+        at once, and queues the deletion of its data
+        """
+        self.assertEqual(self.client.get(MANAGE_USER_URL).status_code,
+                         status.HTTP_200_OK)
+
+        res = self.client.delete(MANAGE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['task'], 'delete_user')
+        self.assertEqual(res.data['status'], Job.QUEUED)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(Recipe.objects.count(), 3)
+        self.assertEqual(self.client.get(MANAGE_USER_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+        job = jobs.claim()
+        jobs.run(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertIsNone(job.user)
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class DeleteUserTaskTests(TestCase):
+
+    def setUp(self):
+        self.user = create_account("user1@firstapp.com", recipes=5)
+        self.other = create_account("user2@firstapp.com")
+        self.user.is_active = False
+        self.user.save()
+
+    def claim_job(self, batch_size):
+        jobs.enqueue('delete_user', {
+            'user_id': self.user.id, 'batch_size': batch_size
+        })
+        return jobs.claim()
+
+    def test_purge_in_batches(self):
+        """
+        Test that the data of the user is deleted in batches, leaving the
+        data of other users alone
+        """
+        job = self.claim_job(batch_size=2)
+
+        with patch.object(tasks, 'purge_batch',
+                          wraps=tasks.purge_batch) as purge_batch:
+            result = tasks.delete_user(job)
+
+        # 5 recipes in batches of 2 take 3 batches, 1 tag or ingredient 1
+        self.assertEqual(purge_batch.call_count, 3 + 1 + 1)
+        self.assertEqual(result['deleted'], {
+            'core_recipe_tags': 5, 'core_recipe_ingredients': 5,
+            'core_recipe': 5, 'core_tag': 1, 'core_ingredient': 1,
+        })
+        job.refresh_from_db()
+        self.assertEqual(job.progress, result)
+        self.assertFalse(get_user_model().objects.filter(
+            pk=self.user.pk
+        ).exists())
+        self.assertFalse(CollectionVersion.objects.filter(
+            user_id=self.user.pk
+        ).exists())
+        self.assertEqual(Recipe.objects.filter(user=self.other).count(), 3)
+        self.assertEqual(Recipe.tags.through.objects.count(), 3)
+        self.assertEqual(Tag.objects.get().user, self.other)
+
+    def test_retry_resumes(self):
+        """Test that a failed deletion picks up where it stopped"""
+        job = self.claim_job(batch_size=2)
+        purge_batch = tasks.purge_batch
+        calls = []
+
+        def fail_third(*args):
+            calls.append(args)
+            if len(calls) == 3:
+                raise RuntimeError('Connection lost')
+            return purge_batch(*args)
+
+        with patch.object(tasks, 'purge_batch', side_effect=fail_third), \
+                self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+
+        Job.objects.update(run_after=job.created_at)
+        jobs.run(jobs.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result['deleted']['core_recipe_tags'], 5)
+        self.assertEqual(job.result['deleted']['core_recipe'], 5)
+        self.assertFalse(Recipe.objects.filter(user_id=self.user.pk).exists())
+
+    def test_active_user_refused(self):
+        """Test that active users are not deleted, nor retried"""
+        job = jobs.enqueue('delete_user', {
+            'user_id': self.other.id
+        })
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run(jobs.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('is active', job.error)
+        self.assertTrue(Recipe.objects.filter(user=self.other).exists())
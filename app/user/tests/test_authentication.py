@@ -0,0 +1,127 @@
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from user.authentication import TokenCache, token_cache
+
+MANAGE_USER_URL = reverse("user:manage")
+
+
+class Cached_Token_Authentication_Test(TransactionTestCase):
+    """
+    Test the cached token authentication, committing so the invalidations
+    run
+    """
+    def setUp(self):
+        token_cache.local.clear()
+        self.user = get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="awesome1"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+    def test_token_lookup_cached(self):
+        """Test that the token is only looked up on the first request"""
+        with self.assertNumQueries(1):
+            res = self.client.get(MANAGE_USER_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(MANAGE_USER_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email_add'], self.user.email_add)
+
+    def test_deleted_token_rejected(self):
+        """Test that a deleted token stops authenticating"""
+        self.client.get(MANAGE_USER_URL)
+        self.token.delete()
+
+        res = self.client.get(MANAGE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_invalidated_on_commit(self):
+        """
+        Test that a token cached again by a concurrent request before the
+        deletion commits is still dropped
+        """
+        key = self.token.key
+        credentials = (self.user, self.token)
+        with transaction.atomic():
+            self.token.delete()
+            token_cache.set(key, credentials)
+            self.assertIsNotNone(token_cache.get(key))
+
+        self.assertIsNone(token_cache.get(key))
+
+    def test_cached_user_not_shared(self):
+        """Test that every request gets its own cached user instance"""
+        token_cache.set(self.token.key, (self.user, self.token))
+        self.user.name = "Changed"
+
+        user, token = token_cache.get(self.token.key)
+        user.is_active = False
+
+        self.assertEqual(user.name, "")
+        self.assertTrue(token_cache.get(self.token.key)[0].is_active)
+        self.assertEqual(token.user_id, self.user.id)
+
+    def test_deactivated_user_rejected(self):
+        """Test that the token of a deactivated user stops authenticating"""
+        self.client.get(MANAGE_USER_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(MANAGE_USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_invalidates_cache(self):
+        """Test that updating the profile drops the cached user"""
+        self.client.get(MANAGE_USER_URL)
+        res = self.client.patch(
+            MANAGE_USER_URL,
+            {"name": "New Name", "password": "newawesome1"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(token_cache.get(self.token.key))
+
+        res = self.client.get(MANAGE_USER_URL)
+
+        self.assertEqual(res.data['name'], "New Name")
+
+    @override_settings(TOKEN_AUTH_CACHE={
+        'LOCAL_MAX_ENTRIES': 10, 'LOCAL_TIMEOUT': 30,
+        'SHARED_CACHE': 'default', 'SHARED_TIMEOUT': 300,
+    })
+    def test_invalidated_in_other_workers(self):
+        """
+        Test that an invalidation in one worker drops the local copies of
+        other workers sharing the cache, and what they were about to cache
+        """
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        key = self.token.key
+        credentials = (self.user, self.token)
+        worker, other = TokenCache(), TokenCache()
+        worker.set(key, credentials, worker.version(key))
+        self.assertIsNotNone(worker.get(key))
+
+        version = worker.version(key)
+        other.invalidate(key)
+        worker.set(key, credentials, version)
+
+        self.assertIsNone(worker.get(key))
+        self.assertIsNone(TokenCache().get(key))
+
+        worker.set(key, credentials, worker.version(key))
+        self.assertIsNotNone(worker.get(key))
+        self.assertIsNotNone(TokenCache().get(key))
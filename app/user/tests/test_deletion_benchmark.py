@@ -0,0 +1,52 @@
+import os
+import time
+import tracemalloc
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import jobs
+from core.models import Recipe, User
+from core.tests.utils import benchmark
+from user.tasks import delete_user
+
+
+@benchmark
+class AccountDeletionBenchmark(TestCase):
+    """
+    Report the peak Python memory of deleting an account holding
+    BENCHMARK_RECIPES recipes (100k by default) and check it against its
+    target
+    """
+    recipes = int(os.environ.get('BENCHMARK_RECIPES', 100000))
+    target_mb = float(os.environ.get('DELETE_TARGET_PEAK_MB', 5))
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', users=1, tags=50, ingredients=200,
+                     recipes=cls.recipes, stdout=StringIO())
+
+    def test_peak_memory(self):
+        """Test that memory stays flat however large the account is"""
+        user = User.objects.get(email_add='seed-0@example.com')
+        user.is_active = False
+        user.save()
+        jobs.enqueue('delete_user', {'user_id': user.id})
+        job = jobs.claim()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = delete_user(job)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+        print('\nDeleted %d recipes in %.1fs, peak memory %.2f MB' % (
+            result['deleted']['core_recipe'], elapsed, peak
+        ))
+
+        self.assertEqual(result['deleted']['core_recipe'], self.recipes)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertLess(peak, self.target_mb)
@@ -0,0 +1,185 @@
+import warnings
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import CacheKeyWarning
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.cache import CacheCounterStore, LocalCounterStore
+
+CREATE_USER_URL = reverse("user:create")
+TOKEN_URL = reverse("user:token")
+
+
+def throttle_settings(**rates):
+    return dict(
+        settings.THROTTLE,
+        RATES=dict(settings.THROTTLE['RATES'], **rates)
+    )
+
+
+class CounterStoreTests(SimpleTestCase):
+
+    def check_store(self, store):
+        with patch('time.time', return_value=1000.0):
+            self.assertEqual(store.hit('key', 60), (0, 1))
+            self.assertEqual(store.hit('key', 60), (0, 2))
+            self.assertEqual(store.hit('other', 60), (0, 1))
+        with patch('time.time', return_value=1070.0):
+            self.assertEqual(store.hit('key', 60), (2, 1))
+        with patch('time.time', return_value=1200.0):
+            self.assertEqual(store.hit('key', 60), (0, 1))
+
+    def test_local_store(self):
+        """Test counting hits per window in process"""
+        self.check_store(LocalCounterStore(100))
+
+    def test_cache_store(self):
+        """Test counting hits per window in a shared cache"""
+        cache = caches['default']
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        self.check_store(CacheCounterStore(cache, 100))
+
+
+class Login_Throttle_Test(TestCase):
+    """Test throttling of the token endpoint"""
+    def setUp(self):
+        self.client = APIClient()
+        get_user_model().objects.create_user(
+            email_add="user1@firstapp.com",
+            password="awesome1"
+        )
+
+    def login(self, email="user1@firstapp.com", **extra):
+        return self.client.post(
+            TOKEN_URL, {"email_add": email, "password": "wrong"}, **extra
+        )
+
+    @override_settings(THROTTLE=throttle_settings(login_account='2/m'))
+    def test_account_throttled_before_authenticate(self):
+        """
+        Test that a burst against one account is rejected without
+        checking the password
+        """
+        self.login()
+        self.login("USER1@firstapp.com ", REMOTE_ADDR="10.0.0.2")
+
+        with patch('user.serializers.authenticate') as authenticate:
+            res = self.login(REMOTE_ADDR="10.0.0.3")
+
+        authenticate.assert_not_called()
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(res['Retry-After']), 0)
+        self.assertEqual(
+            self.login("user2@firstapp.com").status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    @override_settings(THROTTLE=throttle_settings(login_ip='2/m'))
+    def test_ip_throttled(self):
+        """Test that a burst from one address is rejected for any account"""
+        self.login("a@firstapp.com")
+        self.login("b@firstapp.com")
+
+        res = self.login("c@firstapp.com")
+        other = self.login("c@firstapp.com", REMOTE_ADDR="10.0.0.2")
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(THROTTLE=throttle_settings(login_ip='2/m'))
+    def test_forwarded_for_ignored(self):
+        """Test that a spoofed X-Forwarded-For does not reset the count"""
+        self.login("a@firstapp.com", HTTP_X_FORWARDED_FOR="1.1.1.1")
+        self.login("b@firstapp.com", HTTP_X_FORWARDED_FOR="2.2.2.2")
+
+        res = self.login("c@firstapp.com", HTTP_X_FORWARDED_FOR="3.3.3.3")
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(
+        THROTTLE=throttle_settings(login_ip='2/m'),
+        REST_FRAMEWORK={'NUM_PROXIES': 1}
+    )
+    def test_forwarded_for_behind_proxy(self):
+        """Test that only the address added by the proxy is trusted"""
+        self.login("a@firstapp.com", HTTP_X_FORWARDED_FOR="1.1.1.1, 10.0.0.9")
+        self.login("b@firstapp.com", HTTP_X_FORWARDED_FOR="2.2.2.2, 10.0.0.9")
+
+        res = self.login("c@firstapp.com", HTTP_X_FORWARDED_FOR="10.0.0.9")
+        other = self.login("c@firstapp.com", HTTP_X_FORWARDED_FOR="10.0.0.8")
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(THROTTLE=throttle_settings(login_account='2/m'))
+    def test_rejected_attempts_counted(self):
+        """Test that rejected attempts keep an account blocked"""
+        with patch('time.time', return_value=1000.0):
+            for _ in range(5):
+                self.login()
+        with patch('time.time', return_value=1030.0):
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(THROTTLE=throttle_settings(login_account='2/m'))
+    def test_allowance_refills(self):
+        """Test that the allowance comes back once the window slides by"""
+        with patch('time.time', return_value=1000.0):
+            self.login()
+            self.login()
+        with patch('time.time', return_value=1125.0):
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(THROTTLE=dict(
+        throttle_settings(signup_ip='1/h'), STORE='default'
+    ))
+    def test_signup_throttled_with_shared_store(self):
+        """Test throttling signups per address with the shared store"""
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        payload = {
+            "email_add": "new@firstapp.com",
+            "password": "test123",
+            "name": "New"
+        }
+
+        res = self.client.post(CREATE_USER_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        payload["email_add"] = "new2@firstapp.com"
+        res = self.client.post(CREATE_USER_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(THROTTLE=dict(
+        throttle_settings(login_account='2/m'), STORE='default'
+    ))
+    def test_untrusted_keys_with_shared_store(self):
+        """
+        Test that emails memcached could not use in a key are still counted
+        in the shared store
+        """
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        emails = ("a" * 300 + "@firstapp.com", "a b\x01@firstapp.com")
+
+        with warnings.catch_warnings():
+            # Memcached raises where the other backends only warn
+            warnings.simplefilter('error', CacheKeyWarning)
+            for email in emails:
+                self.assertEqual(self.login(email).status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+                self.login(email)
+                self.assertEqual(self.login(email).status_code,
+                                 status.HTTP_429_TOO_MANY_REQUESTS)
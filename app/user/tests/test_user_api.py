@@ -1,10 +1,13 @@
-from django.test import TestCase
+from django.conf import settings
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from user.throttling import get_counter_store
+
 CREATE_USER_URL = reverse("user:create")
 TOKEN_URL = reverse("user:token")
 MANAGE_USER_URL = reverse("user:manage")
@@ -17,6 +20,7 @@ def create_user(**params):
 class Public_User_API_Test(TestCase):
     """Test Public user API endpoint"""
     def setUp(self):
+        get_counter_store().clear()
         self.client = APIClient()
 
     def test_create_user_success(self):
@@ -81,6 +85,49 @@ class Public_User_API_Test(TestCase):
         # we will be using Django's internal authentication system
         self.assertIn('token', res.data)
 
+    def test_password_rehashed_on_login(self):
+        """
+        Test that a password hashed with an outdated cost is rehashed
+        with the configured cost on a successful login
+        """
+        payload = {
+            "email_add": "test@firstapp.com",
+            "password": "test",
+        }
+        old_cost = dict(
+            settings.PASSWORD_HASHER_COST,
+            PBKDF2_ITERATIONS=1000
+        )
+        with override_settings(PASSWORD_HASHER_COST=old_cost):
+            user = create_user(**payload)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$%d$' % (
+            settings.PASSWORD_HASHER_COST['PBKDF2_ITERATIONS']
+        )))
+        self.assertTrue(user.check_password(payload['password']))
+
+    def test_password_rehashed_with_argon2(self):
+        """Test that selecting argon2 upgrades passwords on login"""
+        payload = {
+            "email_add": "test@firstapp.com",
+            "password": "test",
+        }
+        user = create_user(**payload)
+
+        with override_settings(
+                PASSWORD_HASHERS=settings.PASSWORD_HASHERS[::-1]):
+            res = self.client.post(TOKEN_URL, payload)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith('argon2$'))
+            self.assertTrue(user.check_password(payload['password']))
+
     def test_token_not_created_invalid_cred(self):
         """Test that a token was not created for invalid credentials"""
         payload = {
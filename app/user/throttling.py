@@ -0,0 +1,112 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.throttling import BaseThrottle
+
+from core.cache import CacheCounterStore, LocalCounterStore
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_counter_store = None
+
+
+def get_counter_store():
+    """Return the counter store configured in the settings"""
+    global _counter_store
+    if _counter_store is None:
+        config = settings.THROTTLE
+        if config['STORE'] == 'local':
+            _counter_store = LocalCounterStore(config['MAX_ENTRIES'])
+        else:
+            _counter_store = CacheCounterStore(
+                caches[config['STORE']], config['MAX_ENTRIES']
+            )
+    return _counter_store
+
+
+@receiver(setting_changed)
+def reset_counter_store(setting, **kwargs):
+    global _counter_store
+    if setting == 'THROTTLE':
+        _counter_store = None
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Allow a number of requests per period for every key, counted over a
+    window sliding with time: the count of the previous window is weighed
+    by how much of it still overlaps. Like a token bucket, bursts of the
+    whole allowance pass and the allowance then refills evenly. Rejected
+    requests count too, so a client hammering the endpoint stays blocked.
+
+    DRF checks throttles before the view runs, so throttled logins never
+    reach authenticate() and its password hashing.
+    """
+    scope = None
+
+    def get_key(self, request, view):
+        """Return the key to count the request under, or None to skip it"""
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def parse_rate(self):
+        """Return the allowed requests and the period in seconds"""
+        count, period = settings.THROTTLE['RATES'][self.scope].split('/')
+        return int(count), DURATIONS[period[0]]
+
+    def allow_request(self, request, view):
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+
+        allowed, window = self.parse_rate()
+        # Keys come from the request, so hash them into a short string any
+        # cache backend accepts
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        previous, current = get_counter_store().hit(
+            '%s:%s' % (self.scope, digest), window
+        )
+        overlap = 1 - (time.time() % window) / window
+        if previous * overlap + current <= allowed:
+            return True
+
+        if current <= allowed:
+            # Until enough of the previous window has slid out
+            excess = previous * overlap + current - allowed
+            self.retry_after = excess / previous * window
+        else:
+            # Until this window is over and then slid out far enough
+            self.retry_after = (overlap + 1 - allowed / current) * window
+        return False
+
+    def wait(self):
+        return self.retry_after
+
+
+class IPThrottle(SlidingWindowThrottle):
+    """Throttle by client address"""
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class SignupIPThrottle(IPThrottle):
+    scope = 'signup_ip'
+
+
+class LoginAccountThrottle(SlidingWindowThrottle):
+    """Throttle login attempts by the account they target, from any address"""
+    scope = 'login_account'
+
+    def get_key(self, request, view):
+        email = request.data.get('email_add')
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return email.strip().lower()
@@ -1,26 +1,55 @@
-from rest_framework import generics, authentication, permissions
+from django.db import transaction
+from rest_framework import generics, permissions, status
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+
+from core.jobs import enqueue
+from core.serializers import JobSerializer
+from user.authentication import CachedTokenAuthentication
 from user.serializers import UserSerializer, AuthTokenSerializer
+from user.throttling import LoginAccountThrottle, LoginIPThrottle, \
+                            SignupIPThrottle
 
 
 class CreateUserView(generics.CreateAPIView):
     """View to create a user"""
     serializer_class = UserSerializer
+    authentication_classes = ()
+    throttle_classes = (SignupIPThrottle,)
 
 
 class AuthTokenView(ObtainAuthToken):
     """Auth token view"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # No authentication, so no password is checked before the throttles
+    authentication_classes = ()
+    throttle_classes = (LoginIPThrottle, LoginAccountThrottle)
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """View to manage authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """Retrieve and show the authenticated user"""
         return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Deactivate the account and revoke its token at once, then leave
+        the deletion of its data to a background job, since large accounts
+        take a while
+        """
+        user = self.get_object()
+        with transaction.atomic():
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+            Token.objects.filter(user=user).delete()
+            job = enqueue('delete_user', {'user_id': user.pk}, user=user)
+        serializer = JobSerializer(job, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)